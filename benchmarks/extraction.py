@@ -0,0 +1,85 @@
+"""
+Compares the old per-element extraction loop with the single page.evaluate extraction.
+Runs against a synthetic 100-row table shaped like the Tanzania (darlux.co.tz) results.
+
+Usage (from the repository root):
+    python -m benchmarks.extraction [rows]
+"""
+import asyncio
+import sys
+import time
+
+from pyppeteer import launch
+from scripts.utils.extraction import extract_rows
+
+
+def build_table(rows: int) -> str:
+    cells = ''.join('<td>cell {}</td>'.format(i) for i in range(4))
+    body = ''.join(
+        '<tr>{}<td>{:02d}:00 Hrs</td><td>{:02d}:30 Hrs</td><td>x</td><td>{} TSh</td></tr>'.format(
+            cells, i % 24, (i + 5) % 24, 30000 + i)
+        for i in range(rows))
+    return '<table id="example"><tbody id="search_result">{}</tbody></table>'.format(body)
+
+
+def count_round_trips(page):
+    """
+    Wraps the CDP session of the page, so every message sent to the browser is counted.
+    """
+    client = page._client
+    original_send = client.send
+    counter = {'sent': 0}
+
+    def send(method, params=None):
+        counter['sent'] += 1
+        return original_send(method, params)
+
+    client.send = send
+    return counter
+
+
+async def per_element(page):
+    list_dict = []
+    all_items = await page.xpath('//*[@id="search_result"]/tr')
+    for item in all_items:
+        tds = await item.querySelectorAll('td')
+        if len(tds) > 1:
+            price = await page.evaluate('(element) => element.textContent', tds[7])
+            dep_time = await page.evaluate('(element) => element.textContent', tds[4])
+            arr_time = await page.evaluate('(element) => element.textContent', tds[5])
+            list_dict.append({'departure_time': dep_time, 'arrival_time': arr_time, 'price': price})
+    return list_dict
+
+
+async def single_round_trip(page):
+    return await extract_rows(page, '//*[@id="search_result"]/tr', {
+        'second_cell': ('td', 1),
+        'price': ('td', 7),
+        'dep_time': ('td', 4),
+        'arr_time': ('td', 5),
+    })
+
+
+async def measure(page, counter, extractor):
+    counter['sent'] = 0
+    started = time.perf_counter()
+    rows = await extractor(page)
+    elapsed = time.perf_counter() - started
+    return len(rows), counter['sent'], elapsed
+
+
+async def main(rows: int):
+    browser = await launch(headless=True)
+    try:
+        page = await browser.newPage()
+        await page.setContent(build_table(rows))
+        counter = count_round_trips(page)
+        for name, extractor in (('per element', per_element), ('single evaluate', single_round_trip)):
+            found, sent, elapsed = await measure(page, counter, extractor)
+            print('{:<16} rows={:<5} round_trips={:<6} wall={:.1f} ms'.format(name, found, sent, elapsed * 1000))
+    finally:
+        await browser.close()
+
+
+if __name__ == '__main__':
+    asyncio.get_event_loop().run_until_complete(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100))
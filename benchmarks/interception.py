@@ -0,0 +1,63 @@
+"""
+Loads the home page of every scraped site with and without the interception policy
+and reports the downloaded bytes and the load time of both runs.
+
+Usage (from the repository root):
+    python -m benchmarks.interception [site ...]
+"""
+import asyncio
+import sys
+import time
+
+from pyppeteer import launch
+from scripts.utils.interception import intercept
+
+SITES = {
+    'busbud.com': 'https://www.busbud.com/en-gb',
+    'checkmybus.de': 'https://www.checkmybus.de/',
+    'bahn.de': 'https://www.bahn.de/',
+    'irishrail.ie': 'https://www.irishrail.ie/',
+    'directferries.de': 'https://www.directferries.de/',
+    'railways.kz': 'https://bilet.railways.kz/',
+    'railway.am': 'https://www.railway.am/ru/table',
+    'pv.lv': 'https://www.pv.lv/en/',
+    'metroturizm.com.tr': 'https://www.metroturizm.com.tr/en/',
+    'copsa.com.uy': 'https://www.copsa.com.uy/es/',
+    'darlux.co.tz': 'https://www.darlux.co.tz/home.aspx',
+    'metickets.krc.co.ke': 'https://metickets.krc.co.ke/',
+    'ask-aladdin.com': 'https://ask-aladdin.com/egypt-transport-system/bus-timetables/',
+}
+
+
+async def load(browser, site: str, url: str, blocking: bool):
+    context = await browser.createIncognitoBrowserContext()
+    page = await context.newPage()
+    loaded = {'bytes': 0}
+    page._client.on('Network.loadingFinished',
+                    lambda event: loaded.__setitem__('bytes', loaded['bytes'] + int(event.get('encodedDataLength', 0))))
+    if blocking:
+        await intercept(page, site)
+    started = time.perf_counter()
+    try:
+        await page.goto(url, {'waitUntil': 'load', 'timeout': 90000})
+    except Exception as error:
+        print(f'{site}: {error}')
+    elapsed = time.perf_counter() - started
+    await context.close()
+    return loaded['bytes'], elapsed
+
+
+async def main(sites):
+    browser = await launch(headless=True, args=['--no-sandbox'])
+    try:
+        for site in sites:
+            full_bytes, full_time = await load(browser, site, SITES[site], blocking=False)
+            lean_bytes, lean_time = await load(browser, site, SITES[site], blocking=True)
+            print('{:<22} bytes {:>10} -> {:>10} (saved {:>10})   load {:6.2f}s -> {:6.2f}s ({:+.2f}s)'.format(
+                site, full_bytes, lean_bytes, full_bytes - lean_bytes, full_time, lean_time, lean_time - full_time))
+    finally:
+        await browser.close()
+
+
+if __name__ == '__main__':
+    asyncio.get_event_loop().run_until_complete(main(sys.argv[1:] or list(SITES)))
@@ -1,19 +1,69 @@
 import asyncio
 
-from google_trans_new import google_translator
 from datetime import datetime
 
-from pyppeteer import launch
 from pyppeteer.page import PageError, Page
-from pyppeteer.errors import TimeoutError
-from logging import Logger
+from pyppeteer.errors import ElementHandleError, TimeoutError
+from logging import Logger, getLogger
 from configurations.settings import DARK_PURPLE, ENDE, INBOX, LIGHT_BLUE
-from typing import Dict
-from currency_converter import CurrencyConverter
+from typing import AsyncIterator, Dict, List, Optional
+from scripts.utils import batching
+from scripts.utils.batching import DateStep
+from scripts.utils.aliases import best_match, localize
+from scripts.utils.datepicker import set_date
+from scripts.utils.extraction import extract_rows
+from scripts.utils.pool import BrowserPool
+from scripts.utils.interception import intercept
+from scripts.utils.normalization import format_times
+from scripts.utils.rates import rates
+
+
+async def extract_results(page: Page, date: str, logger: Logger) -> Optional[List[Dict]]:
+    """
+    Waits for the railway.am timetable and reads it.
+    :return: Data rows, None when the search has no results.
+    """
+    try:
+        await page.waitForXPath('//div[@class="table-responsive"]//table[contains(@class,"table")]/tbody',
+                                {'visible': True, 'timeout': 20000})
+    except TimeoutError:
+        logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS"{ENDE}')
+        return None
 
+    all_items = await extract_rows(page, '.table-responsive .table tbody', {
+        'second_cell': ('td', 1),
+        'price': ('td', -1),
+        'dep_time': ('td', 3),
+        'arr_time': ('td', -3),
+    })
 
-async def get_info(
+    if any(item['second_cell'] is None for item in all_items):
+        logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"TICKETS FOUND"{ENDE}')
+        return None
+
+    '''
+        Times come as "HH:MM:SS"
+    '''
+    departure_times = format_times([item['dep_time'] for item in all_items])
+    arrival_times = format_times([item['arr_time'] for item in all_items])
+    list_dict = []
 
+    for item, dep_time_text, arr_time_text in zip(all_items, departure_times, arrival_times):
+        list_dict.append({
+            'date': date,
+            'departure_time': dep_time_text,
+            'arrival_time': arr_time_text,
+            'price': item['price'].strip().replace('\xa0', ' ')
+        })
+    '''
+        Prices are in драм (AMD)
+    '''
+    await rates.ready()
+    return rates.to_eur(list_dict, 'AMD')
+
+
+async def get_info(
+        page: Page,
         country_id: int,
         origin: str,
         origin_id: int,
@@ -42,15 +92,11 @@ async def get_info(
     '''
         Correcting input data
     '''
-    browser = await launch(headless=False, autoClose=False)
-    page = await browser.newPage()
-
-    translator = google_translator()
-    origin = translator.translate(origin, lang_src='en', lang_tgt='ru').strip()
-    destination = translator.translate(
-        destination, lang_src='en', lang_tgt='ru').strip()
+    origin = await localize('railway.am', origin_id, origin)
+    destination = await localize('railway.am', destination_id, destination)
     # date_ = datetime.fromisoformat(date)
     # date_ = date_.strftime("%d-%m-%Y")
+    await intercept(page, 'railway.am')
     try:
         await page.goto('https://www.railway.am/ru/table', timeout=90000)
     except (TimeoutError, PageError):
@@ -60,19 +106,13 @@ async def get_info(
     '''
 
     async def selected(select, text):
-        bool = await page.evaluate(''' 
-            (sel, txt) => {
-                for (let i = 0; i < sel.length; i++) {
-                    if (sel[i].textContent.includes(txt))
-                    {   
-                        sel[i].selected = true;
-                        return true;
-                    }
-                }
-                return false;
-            }
-        ''', select, text)
-        return bool
+        options = await page.evaluate(
+            '(sel) => Array.from(sel.options).map((option) => option.textContent)', select)
+        index = best_match(text, options)
+        if index is None:
+            return False
+        await page.evaluate('(sel, index) => { sel.options[index].selected = true; }', select, index)
+        return True
 
     try:
         await page.waitForSelector('#country', {'visible': True, 'timeout': 5000})
@@ -98,6 +138,7 @@ async def get_info(
 
     if not (await selected(origin_select, origin)):
         logger.error(f'{DARK_PURPLE}Departure City Is Not Valid')
+        batching.route_invalid(page)
         return {
             'country_id': country_id,
             'origin_id': origin_id,
@@ -122,6 +163,7 @@ async def get_info(
 
     if not (await selected(destination_select, destination)):
         logger.error(f'{DARK_PURPLE}Arrival City Is Not Valid')
+        batching.route_invalid(page)
         return {
             'country_id': country_id,
             'origin_id': origin_id,
@@ -139,24 +181,13 @@ async def get_info(
     """
 
     try:
-        dep_date = await page.waitForSelector('#datepicker_from',
-                                              {'visible': True, 'timeout': 10000})
-        await page.evaluate(
-            '''(selector) => document.querySelector(selector).removeAttribute("readonly")''',
-            '#datepicker_from')
-        await dep_date.click({'clickCount': 3})
-        await dep_date.type(date)
+        await page.waitForSelector('#datepicker_from', {'visible': True, 'timeout': 10000})
+        await set_date(page, '#datepicker_from', date)
     except TimeoutError:
         logger.error(
             f'{DARK_PURPLE}Date input {ENDE}{INBOX}{LIGHT_BLUE}"not found ..."{ENDE}')
-
-    await page.evaluate('''(selector) => document.querySelector(selector).click()''', '#search')
-
-    try:
-        await page.waitForXPath('//div[@class="table-responsive"]',
-                                {'visible': True, 'timeout': 20000})
-    except TimeoutError:
-        logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS"{ENDE}')
+    except (PageError, ElementHandleError) as error:
+        logger.error(f'{DARK_PURPLE}Date could not be set {ENDE}{INBOX}{LIGHT_BLUE}"{error}"{ENDE}')
         return {
             'country_id': country_id,
             'origin_id': origin_id,
@@ -169,61 +200,54 @@ async def get_info(
             'status': 400  # No data found
         }
 
-    try:
-        all_items = await page.querySelectorAll('.table tbody')
-    except TimeoutError:
-        logger.error('Tikets not found')
-
-    list_dict = []
+    await page.evaluate('''(selector) => document.querySelector(selector).click()''', '#search')
 
-    for item in all_items:
-        tds = await item.querySelectorAll('td')
-
-        if len(tds) > 1:
-            price = await page.evaluate('(element) => element.textContent', tds[-1])
-            dep_time = await page.evaluate('(element) => element.textContent', tds[3])
-            arr_time = await page.evaluate('(element) => element.textContent', tds[-3])
-
-            price_text = float(price.strip().replace('драм', '').replace('\xa0', ' ')),
-            dep_time_text = dep_time.strip().replace(':00', '')
-            arr_time_text = arr_time.strip().replace(':00', '')
-            converter = CurrencyConverter()
-            for price in price_text:
-                price_text = round(converter.convert(price, 'RUB', 'EUR'),2)
-            list_dict.append({
-                'date': date,
-                'departure_time': dep_time_text.strip(),
-                'arrival_time': arr_time_text.strip(),
-                'price': price_text
-            })
-
-        else:
-            logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"TICKETS FOUND"{ENDE}')
-            return {
-                'country_id': country_id,
-                'origin_id': origin_id,
-                'destination_id': destination_id,
-
-                'data': [],
-                'total_size': total_size,
-                'order': order,
-                'hash_id': hash_id,
-                'status': 400  # No data found
-            }
-
-        total_data = {
+    list_dict = await extract_results(page, date, logger)
+    if list_dict is None:
+        return {
             'country_id': country_id,
             'origin_id': origin_id,
             'destination_id': destination_id,
 
-            'data': list_dict,
+            'data': [],
             'total_size': total_size,
             'order': order,
             'hash_id': hash_id,
-            'status': 200  # Success
+            'status': 400  # No data found
         }
-    print( total_data)
-asyncio.get_event_loop().run_until_complete(
-    get_info(origin='Gyumri', country_id=None, origin_id=3, destination='Yerevan ', destination_id=5, date='15.03.2021',
-             logger=None,
-             total_size=None, order=None, hash_id=None, ))
+
+    total_data = {
+        'country_id': country_id,
+        'origin_id': origin_id,
+        'destination_id': destination_id,
+        'data': list_dict,
+        'total_size': total_size,
+        'order': order,
+        'hash_id': hash_id,
+        'status': 200  # Success
+    }
+    return total_data
+
+
+DATE_STEP = DateStep('#datepicker_from', None, '#search', '.table-responsive .table tbody', extract_results)
+
+
+def get_info_dates(page: Page, country_id: int, origin: str, origin_id: int, destination: str, destination_id: int,
+                   total_size: int, hash_id: str, order: int, dates: List[str], logger: Logger) -> AsyncIterator[Dict]:
+    """
+    Same as get_info for several dates of one route, streaming one result dict per date.
+    """
+    return batching.get_info_dates(get_info, DATE_STEP, page, country_id, origin, origin_id, destination,
+                                   destination_id, total_size, hash_id, order, dates, logger)
+
+
+async def main():
+    async with BrowserPool(browsers=1, tabs=1) as pool:
+        async with pool.lease() as page:
+            print(await get_info(page, origin='Gyumri', country_id=None, origin_id=3, destination='Yerevan ',
+                                 destination_id=5, date='15.03.2021', logger=getLogger(__name__),
+                                 total_size=None, order=None, hash_id=None))
+
+
+if __name__ == '__main__':
+    asyncio.get_event_loop().run_until_complete(main())
@@ -1,72 +1,150 @@
-import requests  # Модуль для обработки URL
-from bs4 import BeautifulSoup  # Модуль для работы с HTML
-import time  # Модуль для остановки программы
+import asyncio  # Модуль для асинхронного цикла опроса
+import os
+import random  # Случайный разброс интервала опроса
 import smtplib  # Модуль для работы с почтой
+import time
+from email.message import EmailMessage
+from logging import Logger, getLogger
+from typing import Dict, Optional, Tuple
 
+from scripts.utils.api import ApiUnavailable, close_session, fetch_json, field
+from scripts.utils.rates import RATES_URL
 
-# Основной класс
-class Currency:
-    # Ссылка на нужную страницу
-    DOLLAR_RUB = 'https://www.google.com/search?sxsrf=ALeKk01NWm6viYijAo3HXYOEQUyDEDtFEw%3A1584716087546&source=hp&ei=N9l0XtDXHs716QTcuaXoAg&q=%D0%B4%D0%BE%D0%BB%D0%BB%D0%B0%D1%80+%D0%BA+%D1%80%D1%83%D0%B1%D0%BB%D1%8E&oq=%D0%B4%D0%BE%D0%BB%D0%BB%D0%B0%D1%80+&gs_l=psy-ab.3.0.35i39i70i258j0i131l4j0j0i131l4.3044.4178..5294...1.0..0.83.544.7......0....1..gws-wiz.......35i39.5QL6Ev1Kfk4'
-    # Заголовки для передачи вместе с URL
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) '
-                      'AppleWebKit/537.36 (KHTML, like Gecko) '
-                      'Chrome/88.0.4324.182 Safari/537.36'}
-    current_converted_price = 0
-    difference = 5  # Разница после которой будет отправлено сообщение на почту
-
-    def __init__(self):
-        # Установка курса валюты при создании объекта
-        self.current_converted_price = float(self.get_currency_price().replace(",", "."))
-
-    # Метод для получения курса валюты
-    def get_currency_price(self):
-        # Парсим всю страницу
-        full_page = requests.get(self.DOLLAR_RUB, headers=self.headers)
-
-        # Разбираем через BeautifulSoup
-        soup = BeautifulSoup(full_page.content, 'html.parser')
-
-        # Получаем нужное для нас значение и возвращаем его
-        convert = soup.findAll("span", {"class": "DFlfde", "class": "SwHCTb", "data-precision": 2})
-        return convert[0].text
-
-    # Проверка изменения валюты
-    def check_currency(self):
-        currency = float(self.get_currency_price().replace(",", "."))
-        if currency >= self.current_converted_price + self.difference:
-            print("Курс сильно вырос, может пора что-то делать?")
-            self.send_mail()
-        elif currency <= self.current_converted_price - self.difference:
-            print("Курс сильно упал, может пора что-то делать?")
-            self.send_mail()
-
-        print("Сейчас курс: 1 доллар = " + str(currency))
-        time.sleep(3)  # Засыпание программы на 3 секунды
-        self.check_currency()
-
-    # Отправка почты через SMTP
-    def send_mail(self):
-        server = smtplib.SMTP('smtp.gmail.com', 587)
+Pair = Tuple[str, str]
+
+
+# Одно SMTP соединение на всё время работы монитора
+class Mailer:
+    def __init__(self, host: str = os.environ.get('SMTP_HOST', 'smtp.gmail.com'),
+                 port: int = int(os.environ.get('SMTP_PORT', 587)),
+                 user: str = os.environ.get('SMTP_USER', 'ВАША ПОЧТА'),
+                 password: str = os.environ.get('SMTP_PASSWORD', 'ПАРОЛЬ'),
+                 sender: str = os.environ.get('MAIL_FROM', 'От кого'),
+                 recipient: str = os.environ.get('MAIL_TO', 'Кому')):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.sender = sender
+        self.recipient = recipient
+        self._server: Optional[smtplib.SMTP] = None
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=30)
         server.ehlo()
         server.starttls()
         server.ehlo()
+        server.login(self.user, self.password)
+        return server
+
+    def send(self, subject: str, body: str):
+        message = EmailMessage()
+        message['Subject'] = subject
+        message['From'] = self.sender
+        message['To'] = self.recipient
+        message.set_content(body)
+        # Соединение открывается один раз и переоткрывается, только если сервер его закрыл
+        for attempt in range(2):
+            if self._server is None:
+                self._server = self._connect()
+            try:
+                self._server.send_message(message)
+                return
+            except smtplib.SMTPServerDisconnected:
+                self._server = None
+                if attempt:
+                    raise
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except smtplib.SMTPException:
+                pass
+            self._server = None
+
+
+# Основной класс
+class Currency:
+    """
+    Long running monitor of several currency pairs.
+    One keep-alive HTTP session polls a rate table every `interval` seconds (plus jitter). A pair alerts
+    when it moved by more than its difference since the last alert; alerts of `alert_window` seconds
+    are sent as one mail. The state is one number per pair, so memory stays constant however long it runs.
+    """
+
+    def __init__(self, differences: Dict[Pair, float], interval: float = 60, jitter: float = 0.2,
+                 alert_window: float = 300, mailer: Optional[Mailer] = None, logger: Optional[Logger] = None):
+        """
+        :param differences: Pair (base, quote) -> difference after which a mail is sent.
+        :param jitter: Fraction of the interval added or removed at random on every poll.
+        """
+        self.differences = differences
+        self.interval = interval
+        self.jitter = jitter
+        self.alert_window = alert_window
+        self.mailer = mailer or Mailer()
+        self.logger = logger or getLogger(__name__)
+        self.baselines: Dict[Pair, float] = {}
+        self.pending: Dict[Pair, str] = {}
+        self.last_mail = float('-inf')
+
+    # Метод для получения курсов всех пар одним запросом
+    async def get_currency_prices(self) -> Dict[Pair, float]:
+        rates = field(await fetch_json(RATES_URL), 'rates')
+        prices = {}
+        for base, quote in self.differences:
+            # Пара без курса (или с нулевым курсом) пропускается, опрос продолжается
+            try:
+                prices[(base, quote)] = float(field(rates, quote)) / float(field(rates, base))
+            except (ApiUnavailable, ZeroDivisionError, TypeError, ValueError) as error:
+                self.logger.error(f'Нет курса {base}/{quote}: {error!r}')
+        return prices
 
-        server.login('ВАША ПОЧТА', 'ПАРОЛЬ')
+    # Проверка изменения валют
+    def check_currency(self, prices: Dict[Pair, float]):
+        for pair, price in prices.items():
+            base, quote = pair
+            print(f'Сейчас курс: 1 {base} = {price:.4f} {quote}')
+            baseline = self.baselines.setdefault(pair, price)
+            if price >= baseline + self.differences[pair]:
+                self.pending[pair] = f'Курс {base}/{quote} сильно вырос: {baseline:.4f} -> {price:.4f}'
+            elif price <= baseline - self.differences[pair]:
+                self.pending[pair] = f'Курс {base}/{quote} сильно упал: {baseline:.4f} -> {price:.4f}'
+            else:
+                continue
+            print(self.pending[pair] + ', может пора что-то делать?')
+            # Следующее письмо по паре только после нового движения от этого курса
+            self.baselines[pair] = price
 
-        subject = 'Currency mail'
-        body = 'Currency has been changed!'
-        message = f'Subject: {subject}\n{body}'
+    # Отправка накопленных оповещений одним письмом
+    async def send_mail(self):
+        if not self.pending or time.monotonic() - self.last_mail < self.alert_window:
+            return
+        body = '\n'.join(self.pending.values())
+        self.pending.clear()
+        self.last_mail = time.monotonic()
+        loop = asyncio.get_event_loop()
+        try:
+            await loop.run_in_executor(None, self.mailer.send, 'Currency mail', body)
+        except (smtplib.SMTPException, OSError) as error:
+            self.logger.error(f'Currency mail could not be sent: {error}')
 
-        server.sendmail(
-            'От кого',
-            'Кому',
-            message
-        )
-        server.quit()
+    async def run(self):
+        try:
+            while True:
+                try:
+                    self.check_currency(await self.get_currency_prices())
+                except ApiUnavailable as error:
+                    self.logger.error(f'Currency rates unavailable: {error}')
+                await self.send_mail()
+                await asyncio.sleep(self.interval * (1 + random.uniform(-self.jitter, self.jitter)))
+        finally:
+            await close_session()
+            self.mailer.close()
 
 
-# Создание объекта и вызов метода
-currency = Currency()
-currency.check_currency()
+if __name__ == '__main__':
+    # Создание объекта и запуск мониторинга
+    currency = Currency({('USD', 'RUB'): 5})
+    asyncio.run(currency.run())
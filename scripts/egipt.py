@@ -1,9 +1,147 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+import requests
+from bs4 import BeautifulSoup
 from datetime import datetime
 from pyppeteer.page import PageError, Page
 from pyppeteer.errors import TimeoutError
 from logging import Logger
 from configurations.settings import DARK_PURPLE, ENDE, INBOX, LIGHT_BLUE
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
+from scripts.utils.aliases import normalize
+from scripts.utils.extraction import extract_columns
+from scripts.utils.interception import intercept
+
+TIMETABLES_URL = 'https://ask-aladdin.com/egypt-transport-system/bus-timetables/'
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pickles', 'egypt_timetables.json')
+SNAPSHOT_MAX_AGE = 12 * 60 * 60  # Seconds before the page is fetched again and compared by hash
+SNAPSHOT_MODE = True  # Answer from the local snapshot, the browser flow only when it is unavailable or lacks the route
+
+_TITLE = re.compile(r'^(?:from\s+)?(?P<origin>.+?)\s*(?:\bto\s+(?:the\s+)?|/)\s*(?P<destination>.+?)$', re.I)
+
+
+def route_key(origin: str, destination: str) -> Tuple[str, str]:
+    return normalize(origin), normalize(destination)
+
+
+def parse_timetables(html: str) -> Dict[str, List[List[str]]]:
+    """
+    Parses every accordion route of the timetable page in one pass.
+    :return: Dict of route title to the (company, departure time, price) rows of its table.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    timetables = {}
+    for toggle in soup.select('h4 a.accordion-toggle'):
+        target = None
+        href = toggle.get('href') or ''
+        if href.startswith('#') and len(href) > 1:
+            target = soup.find(id=href[1:])
+        if target is None:
+            parent = toggle.find_parent('div')
+            target = parent.find_next_sibling('div') if parent is not None else None
+        if target is None or target.find('table') is None:
+            continue
+        '''
+            Same layout as the live flow: the first three cells are the header, then (company, time, price)
+        '''
+        info = [td.get_text() for td in target.find('table').find_all('td')]
+        timetables[toggle.get_text().strip()] = [list(row) for row in zip(info[3::3], info[4::3], info[5::3])]
+    return timetables
+
+
+class TimetableSnapshot:
+    """
+    Local, indexed copy of the static ask-aladdin timetables.
+    The page is fetched with plain HTTP (no browser), re-parsed only when its hash changes
+    and stored on disk, so get_info answers from a dict lookup.
+    """
+
+    def __init__(self, path: str = SNAPSHOT_PATH, max_age: float = SNAPSHOT_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self.digest: Optional[str] = None
+        self.fetched_at = 0.0
+        self.timetables: Dict[str, List[List[str]]] = {}
+        self.index: Dict[Tuple[str, str], str] = {}
+        self._lock = asyncio.Lock()
+
+    def _build_index(self):
+        self.index = {}
+        for title in self.timetables:
+            match = _TITLE.match(title)
+            if match:
+                self.index.setdefault(route_key(match['origin'], match['destination']), title)
+
+    def load(self) -> bool:
+        try:
+            with open(self.path, encoding='utf-8') as snapshot_file:
+                stored = json.load(snapshot_file)
+        except (OSError, ValueError):
+            return False
+        self.digest = stored['digest']
+        self.fetched_at = stored['fetched_at']
+        self.timetables = stored['timetables']
+        self._build_index()
+        return True
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as snapshot_file:
+            json.dump({'digest': self.digest, 'fetched_at': self.fetched_at, 'timetables': self.timetables},
+                      snapshot_file, ensure_ascii=False)
+
+    def update(self, html: str):
+        digest = hashlib.sha256(html.encode('utf-8')).hexdigest()
+        if digest != self.digest:
+            self.timetables = parse_timetables(html)
+            self.digest = digest
+            self._build_index()
+        self.fetched_at = time.time()
+        self.save()
+
+    @staticmethod
+    def fetch_html() -> str:
+        res = requests.get(TIMETABLES_URL, timeout=60, headers={'User-Agent': 'Mozilla/5.0'})
+        res.raise_for_status()
+        return res.text
+
+    async def refresh(self, logger: Logger):
+        loop = asyncio.get_event_loop()
+        try:
+            html = await loop.run_in_executor(None, self.fetch_html)
+        except requests.RequestException as error:
+            logger.error(f'{DARK_PURPLE}Timetables could not be fetched: {error}{ENDE}')
+            return
+        self.update(html)
+
+    async def ensure_fresh(self, logger: Logger) -> bool:
+        async with self._lock:
+            if not self.timetables:
+                self.load()
+            if not self.timetables or time.time() - self.fetched_at > self.max_age:
+                await self.refresh(logger)
+        return bool(self.timetables)
+
+    def lookup(self, origin: str, destination: str) -> Optional[List[List[str]]]:
+        title = self.index.get(route_key(origin, destination))
+        if title is None:
+            '''
+                Titles which do not follow the "<origin> to <destination>" pattern; the origin must come first,
+                otherwise the timetable is the one of the opposite direction
+            '''
+            for candidate in self.timetables:
+                start = candidate.find(origin)
+                if start >= 0 and candidate.find(destination, start + len(origin)) >= 0:
+                    title = candidate
+                    break
+        return self.timetables.get(title) if title else None
+
+
+snapshot = TimetableSnapshot()
 
 
 async def get_info(page, country_id, origin, origin_id, destination, destination_id, total_size, hash_id, order, date,
@@ -24,13 +162,30 @@ async def get_info(page, country_id, origin, origin_id, destination, destination
     :return: Dict
     """
 
-    info = []
+    rows = None
+    if SNAPSHOT_MODE and await snapshot.ensure_fresh(logger):
+        rows = snapshot.lookup(origin, destination)
+        if rows is None:
+            logger.error(f'{DARK_PURPLE}Route not in the timetables snapshot, using the browser{ENDE}')
+    if rows is not None:
+        return {
+            'country_id': country_id,
+            'origin_id': origin_id,
+            'destination_id': destination_id,
+            'data': [{'date': date, 'departure_time': d, 'arrival_time': 'None', 'price': p} for (c, d, p) in rows],
+            'total_size': total_size,
+            'order': order,
+            'hash_id': hash_id,
+            'status': 200 if rows else 400
+        }
+
     trip1 = None
     trip2 = None
     trip3 = None
     trip4 = None
     list_dict = []
     # date = None
+    await intercept(page, 'ask-aladdin.com')
     try:
         await page.goto('https://ask-aladdin.com/egypt-transport-system/bus-timetables/', timeout=200000)
     except (TimeoutError, PageError):
@@ -101,10 +256,10 @@ async def get_info(page, country_id, origin, origin_id, destination, destination
                 }
             break
 
-    chosen = await page.xpath('//div/div[@aria-expanded="true"]/div/div/div/table/tbody/tr/td')
-    for i in chosen:
-        name = await page.evaluate('(element) => element.textContent', i)
-        info.append(name)
+    columns = await extract_columns(page, {
+        'cells': '//div/div[@aria-expanded="true"]/div/div/div/table/tbody/tr/td',
+    })
+    info = columns['cells']
     company = info[3::3]
     dep_time = info[4::3]
     price = info[5::3]
@@ -1,13 +1,72 @@
+import time
 from datetime import datetime
 from pyppeteer.page import PageError, Page
 from pyppeteer.errors import TimeoutError
 from logging import Logger
 from configurations.settings import DARK_PURPLE, ENDE, INBOX, LIGHT_BLUE
-from typing import Dict
-from google_trans_new import google_translator
+from typing import AsyncIterator, Dict, List, Optional
+from scripts.utils.aliases import localize
+from scripts.utils.extraction import extract_rows
+from scripts.utils.interception import intercept
+from scripts.utils.pagination import DayWindow, paginate
+from scripts.utils.streaming import NoResults, collect
+from scripts.utils.urls import goto_results, learn_results, record_latency, result_urls
+
+RESULT_ROWS = '//*[@class="boxShadow  scheduledCon "]'
+LATER_BUTTON = '//*[@class="buttonGreyBg later"]'
+'''
+    Departures kept ("HH:MM" bounds) and the most "later" pages loaded for them
+'''
+WINDOW = ('00:00', '23:59')
+MAX_LATER_PAGES = 12
+
+
+async def read_rows(page: Page, rows: str, date: str) -> List[Dict]:
+    items = await extract_rows(page, rows, {
+        'price': 'tbody.boxShadow  span.fareOutput',
+        'dep_time': ('td[class="time"]', 0),
+        'arr_time': ('td[class="time"]', 1),
+    })
+    return [{
+        'date': date,
+        'departure_time': item['dep_time'].strip(),
+        'arrival_time': item['arr_time'].strip(),
+        'price': item['price'].strip().replace('\xa0', ' '),
+    } for item in items]
+
+
+async def wait_overview(page: Page, logger: Logger) -> bool:
+    try:
+        await page.waitForXPath('//*[@id="resultsOverview"]', {'visible': True, 'timeout': 20000})
+    except TimeoutError:
+        logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS"{ENDE}')
+        return False
+    return True
 
 
-async def get_info(
+def extract_pages(page: Page, date: str) -> AsyncIterator[List[Dict]]:
+    """
+    Yields the rows of the connection overview page by page, clicking "later" in between.
+    Stops at the end of the day, the end of WINDOW, or as soon as "later" is gone.
+    """
+    return paginate(page, RESULT_ROWS, LATER_BUTTON, lambda page_, rows: read_rows(page_, rows, date),
+                    window=DayWindow(*WINDOW), max_pages=MAX_LATER_PAGES)
+
+
+async def extract_results(page: Page, date: str, logger: Logger) -> Optional[List[Dict]]:
+    """
+    Waits for the connection overview, expands it with the "later" button and reads it.
+    :return: Data rows, None when the search has no results.
+    """
+    if not await wait_overview(page, logger):
+        return None
+    list_dict = []
+    async for rows in extract_pages(page, date):
+        list_dict.extend(rows)
+    return list_dict
+
+
+async def stream_info(
         page: Page,
         country_id: int,
         origin: str,
@@ -18,31 +77,29 @@ async def get_info(
         hash_id: str,
         order: int,
         date: str,
-        logger: Logger) -> Dict:
+        logger: Logger) -> AsyncIterator[List[Dict]]:
     """
-    The Scraper which built on Pyppeteer. Finds info considering the given params.
-    :param page: Page object used to navigate in Tab of Browser.
-    :param origin: Starting point for scraping.
-    :param destination: Endpoint for scraping.
-    :param date: The date to scrape the info for.
-    :param logger: Page level logger.
-    :param country_id: ID of country being scraped. (Will be used to fetch the country form DB).
-    :param origin_id: ID of origin city. Will be used to fetch the city object.
-    :param destination_id: ID of destination city.
-    :param order: Order of the split (partial) data. (Used in ordering the total data before producing).
-    :param hash_id: Hash ID to determine to which data (the original whole data) this split belongs to.
-    :param total_size: How many splits we need to collect before being sure that whole data is actually processed.
-    :return: Dict
+    Streaming variant of get_info: yields the rows of every results page as soon as it is read.
+    Raises NoResults when the search finds nothing.
     """
     '''
         Correcting input data
     '''
-    translator = google_translator()
-    origin = translator.translate(origin, lang_src='en', lang_tgt='de').strip()
-    destination = translator.translate(
-        destination, lang_src='en', lang_tgt='de').strip()
+    origin = await localize('bahn.de', origin_id, origin)
+    destination = await localize('bahn.de', destination_id, destination)
+    started = await goto_results(page, 'bahn.de', origin_id, destination_id, date, logger, origin, destination)
+    if started is not None:
+        if await wait_overview(page, logger):
+            record_latency('bahn.de', 'url', started)
+            async for rows in extract_pages(page, date):
+                yield rows
+            return
+        result_urls.forget('bahn.de', origin_id, destination_id)
+
+    started = time.monotonic()
     date_ = datetime.fromisoformat(date)
     date_ = date_.strftime("%d-%m-%Y")
+    await intercept(page, 'bahn.de')
     try:
         await page.goto('https://www.bahn.de/', timeout=90000)
     except (TimeoutError, PageError):
@@ -74,17 +131,7 @@ async def get_info(
         await departure_choice.click()
     except TimeoutError:
         logger.error(f'{DARK_PURPLE}Could not locate {ENDE}{INBOX}{LIGHT_BLUE}"ORIGIN"{ENDE}')
-        return {
-            'country_id': country_id,
-            'origin_id': origin_id,
-            'destination_id': destination_id,
-
-            'data': [],
-            'total_size': total_size,
-            'order': order,
-            'hash_id': hash_id,
-            'status': 400  # No data found
-        }
+        raise NoResults(origin)
 
     '''
         Locate Fields
@@ -98,17 +145,7 @@ async def get_info(
         await departure_choice.click()
     except TimeoutError:
         logger.error(f'{DARK_PURPLE}Could not locate {ENDE}{INBOX}{LIGHT_BLUE}"DESTINATION"{ENDE}')
-        return {
-            'country_id': country_id,
-            'origin_id': origin_id,
-            'destination_id': destination_id,
-
-            'data': [],
-            'total_size': total_size,
-            'order': order,
-            'hash_id': hash_id,
-            'status': 400  # No data found
-        }
+        raise NoResults(destination)
     while True:
         try:
             await page.waitForSelector('input[value="Suchen"]', {'visible': True, 'timeout': 5000})
@@ -116,60 +153,40 @@ async def get_info(
         except TimeoutError:
             break
 
-    try:
-        await page.waitForXPath('//*[@id="resultsOverview"]', {'visible': True, 'timeout': 20000})
-    except TimeoutError:
-        logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS"{ENDE}')
-        return {
-            'country_id': country_id,
-            'origin_id': origin_id,
-            'destination_id': destination_id,
-
-            'data': [],
-            'total_size': total_size,
-            'order': order,
-            'hash_id': hash_id,
-            'status': 400  # No data found
-        }
+    if not await wait_overview(page, logger):
+        raise NoResults(date)
+    learn_results(page, 'bahn.de', origin_id, destination_id, date_, '%d-%m-%Y', started)
+    async for rows in extract_pages(page, date):
+        yield rows
 
-    while True:
-        try:
-            find_later_button = await page.waitForXPath('//*[@class="buttonGreyBg later"]',
-                                                        {'visible': True, 'timeout': 5000})
-            await find_later_button.click()
-        except Exception:
-            break
-
-    all_items = await page.xpath('//*[@class="boxShadow  scheduledCon "]')
-
-    list_dict = []
 
-    for item in all_items:
-        price = await item.querySelector('tbody.boxShadow  span.fareOutput')
-        times = await item.querySelectorAll('td[class="time"]')
-        dep_time = times[0]
-        arr_time = times[1]
-
-        price_text = await page.evaluate('(element) => element.textContent', price)
-        dep_time_text = await page.evaluate('(element) => element.textContent', dep_time)
-        arr_time_text = await page.evaluate('(element )=> element.textContent', arr_time)
-
-        list_dict.append({
-            'date': date,
-            'departure_time': dep_time_text.strip(),
-            'arrival_time': arr_time_text.strip(),
-            'price': price_text.strip().replace('\xa0', ' '),
-        })
-
-    total_data = {
-        'country_id': country_id,
-        'origin_id': origin_id,
-        'destination_id': destination_id,
-
-        'data': list_dict,
-        'total_size': total_size,
-        'order': order,
-        'hash_id': hash_id,
-        'status': 200  # Success
-    }
-    return total_data
+async def get_info(
+        page: Page,
+        country_id: int,
+        origin: str,
+        origin_id: int,
+        destination: str,
+        destination_id: int,
+        total_size: int,
+        hash_id: str,
+        order: int,
+        date: str,
+        logger: Logger) -> Dict:
+    """
+    The Scraper which built on Pyppeteer. Finds info considering the given params.
+    :param page: Page object used to navigate in Tab of Browser.
+    :param origin: Starting point for scraping.
+    :param destination: Endpoint for scraping.
+    :param date: The date to scrape the info for.
+    :param logger: Page level logger.
+    :param country_id: ID of country being scraped. (Will be used to fetch the country form DB).
+    :param origin_id: ID of origin city. Will be used to fetch the city object.
+    :param destination_id: ID of destination city.
+    :param order: Order of the split (partial) data. (Used in ordering the total data before producing).
+    :param hash_id: Hash ID to determine to which data (the original whole data) this split belongs to.
+    :param total_size: How many splits we need to collect before being sure that whole data is actually processed.
+    :return: Dict
+    """
+    return await collect(stream_info(page, country_id, origin, origin_id, destination, destination_id, total_size,
+                                     hash_id, order, date, logger),
+                         country_id, origin_id, destination_id, total_size, hash_id, order)
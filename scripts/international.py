@@ -1,9 +1,149 @@
+import asyncio
+import os
+import re
+import time
 from datetime import datetime
 from pyppeteer.page import PageError, Page
 from pyppeteer.errors import TimeoutError
 from logging import Logger
 from configurations.settings import DARK_PURPLE, ENDE, INBOX, LIGHT_BLUE
-from typing import Dict
+from typing import AsyncIterator, Dict, List, Optional
+from scripts.utils import batching
+from scripts.utils.aliases import aliases
+from scripts.utils.api import ApiUnavailable, fetch_json, field, station_id
+from scripts.utils.batching import DateStep
+from scripts.utils.extraction import extract_columns, extract_rows
+from scripts.utils.interception import intercept
+from scripts.utils.urls import learn_results, open_results
+from scripts.utils.variants import Variant, VariantDetector
+from scripts.utils.waiting import ERROR_TOAST
+
+API_MODE = True  # Try busbud's departures endpoint before driving the browser (needs BUSBUD_TOKEN)
+API_URL = 'https://napi.busbud.com/x-departures/{origin}/{destination}/{date}'
+API_HEADERS = {
+    'Accept': 'application/vnd.busbud+json; version=2; profile=https://schema.busbud.com/v2/',
+    'X-Busbud-Token': os.environ.get('BUSBUD_TOKEN', ''),
+}
+API_POLLS = 5  # The endpoint answers incrementally until "complete" is true
+
+'''
+    City geohashes in a results URL, e.g. /en-gb/r/dr5reg-drt2yz or /bus-schedules-results/dr5reg/drt2yz.
+'''
+RESULTS_URL_IDS = re.compile(r'(?:/r/|/bus-schedules-results/)([0-9a-z]+)[-/]([0-9a-z]+)')
+
+
+def remember_stations(url: str, origin_id: int, destination_id: int):
+    """
+    Stores the geohashes of a results URL in the alias index, so the API mode can use them next time.
+    """
+    match = RESULTS_URL_IDS.search(url)
+    if match:
+        aliases.remember('busbud.com:id', origin_id, match.group(1))
+        aliases.remember('busbud.com:id', destination_id, match.group(2))
+
+
+async def get_departures_api(origin_id: int, destination_id: int, date: str) -> Optional[List[Dict]]:
+    """
+    Departures of the route from busbud's JSON endpoint, in the same row shape as the browser flow.
+    City geohashes come from the alias index (site "busbud.com:id"), learned from result URLs by
+    remember_stations or imported with `python -m scripts.utils.aliases --ids busbud.com geohashes.csv`.
+    :return: None when the endpoint was still not complete after API_POLLS polls.
+    :raise ApiUnavailable: When the endpoint, the ids or the schema do not fit.
+    """
+    url = API_URL.format(origin=station_id('busbud.com', origin_id),
+                         destination=station_id('busbud.com', destination_id),
+                         date=datetime.fromisoformat(date).strftime('%Y-%m-%d'))
+    departures = []
+    for poll in range(API_POLLS):
+        payload = await fetch_json(url, params={'index': len(departures)}, headers=API_HEADERS)
+        departures.extend(field(payload, 'departures', kind=list))
+        if field(payload, 'complete'):
+            break
+        await asyncio.sleep(0.5 * (poll + 1))
+    else:
+        return None
+
+    list_dict = []
+    for departure in departures:
+        list_dict.append({
+            'date': date,
+            'departure_time': field(departure, 'departure_time', kind=str)[11:16],
+            'arrival_time': field(departure, 'arrival_time', kind=str)[11:16],
+            'price': '{:.2f} {}'.format(field(departure, 'prices', 'total', kind=(int, float)) / 100,
+                                        field(departure, 'prices', 'currency', kind=str))
+        })
+    return list_dict
+
+
+async def extract_ver_1(page: Page, date: str, logger: Logger) -> Optional[List[Dict]]:
+    """
+    Older busbud layout: ".departure-list" with one portal per departure.
+    """
+    try:
+        await page.waitForXPath('//*[@class="departure-list--flipper"]//div[@data-portal-key="portal"]',
+                                {'visible': True, 'timeout': 15000})
+    except Exception:
+        logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS 1"{ENDE}')
+        return None
+    all_items = await extract_rows(page, '//div[@data-portal-key="portal"]', {
+        'price': 'div.departure-card--price',
+        'dep_time': ('.text-std.text-right', 0),
+        'arr_time': ('.text-std.text-right', 1),
+    })
+
+    list_dict = []
+
+    for item in all_items:
+        list_dict.append({
+            'date': date,
+            'departure_time': item['dep_time'].strip(),
+            'arrival_time': item['arr_time'].strip(),
+            'price': item['price'].strip().replace('\xa0', ' ')
+        })
+    return list_dict
+
+
+async def extract_ver_2(page: Page, date: str, logger: Logger) -> Optional[List[Dict]]:
+    """
+    Newer busbud layout: "departure-card" elements.
+    """
+    list_dict = []
+    columns = await extract_columns(page, {
+        'prices': '//*[@data-cy="displayed-price"]',
+        'times': '//span[contains(text(),":")]',
+    })
+
+    times_txt = columns['times']
+    prices_text = columns['prices']
+    dep_times_text = times_txt[0::2]
+    arr_times_text = times_txt[1::2]
+
+    for price, dep_time, arr_time in zip(prices_text, dep_times_text, arr_times_text):
+        list_dict.append({
+            'date': date,
+            'departure_time': dep_time,
+            'arrival_time': arr_time,
+            'price': price.strip().replace('\xa0', ' ')
+        })
+    return list_dict
+
+
+LAYOUTS = VariantDetector('busbud.com', [
+    Variant('ver_1', '.departure-list [data-portal-key="portal"]', extract_ver_1),
+    Variant('ver_2', '//*[@data-cy="departure-card"]', extract_ver_2),
+], failures=dict({'no_results': ('h1, h2, h3, p', 'no departures')}, **ERROR_TOAST))
+
+
+async def extract_results(page: Page, date: str, logger: Logger) -> Optional[List[Dict]]:
+    """
+    Waits for whichever busbud layout is served and reads it.
+    :return: Data rows, None when the search has no results.
+    """
+    variant = await LAYOUTS.detect(page, timeout=30000)
+    list_dict = await variant.extract(page, date, logger) if variant else None
+    if list_dict is None:
+        logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS"{ENDE}')
+    return list_dict
 
 
 async def get_info(
@@ -34,8 +174,47 @@ async def get_info(
     :return: Dict
     """
 
+    if API_MODE and API_HEADERS['X-Busbud-Token']:
+        try:
+            list_dict = await get_departures_api(origin_id, destination_id, date)
+        except ApiUnavailable as error:
+            logger.error(f'{DARK_PURPLE}API mode unavailable, using the browser: {error}{ENDE}')
+            list_dict = None
+        else:
+            if list_dict is None:
+                logger.error(f'{DARK_PURPLE}API answer still incomplete after {API_POLLS} polls, '
+                             f'using the browser{ENDE}')
+        if list_dict is not None:
+            return {
+                'country_id': country_id,
+                'origin_id': origin_id,
+                'destination_id': destination_id,
+
+                'data': list_dict,
+                'total_size': total_size,
+                'order': order,
+                'hash_id': hash_id,
+                'status': 200 if list_dict else 400
+            }
+
+    list_dict = await open_results(page, 'busbud.com', origin_id, destination_id, date, extract_results, logger)
+    if list_dict is not None:
+        return {
+            'country_id': country_id,
+            'origin_id': origin_id,
+            'destination_id': destination_id,
+
+            'data': list_dict,
+            'total_size': total_size,
+            'order': order,
+            'hash_id': hash_id,
+            'status': 200  # Success
+        }
+
+    started = time.monotonic()
     date_ = datetime.fromisoformat(date)
     date_ = date_.strftime("%Y-%m-%d")
+    await intercept(page, 'busbud.com')
     try:
         await page.goto('https://www.busbud.com/en-gb', timeout=20000)
     except (TimeoutError, PageError):
@@ -66,7 +245,7 @@ async def get_info(
         await departure_choice.click()
     except TimeoutError:
         logger.error(f'{DARK_PURPLE}Could not locate {ENDE}{INBOX}{LIGHT_BLUE}"ORIGIN"{ENDE}')
-        
+        batching.route_invalid(page)
         return {
             'country_id': country_id,
             'origin_id': origin_id,
@@ -94,7 +273,7 @@ async def get_info(
         await arrival_choice.click()
     except TimeoutError:
         logger.error(f'{DARK_PURPLE}Could not locate {ENDE}{INBOX}{LIGHT_BLUE}"DESTINATION"{ENDE}')
-
+        batching.route_invalid(page)
         return {
             'country_id': country_id,
             'origin_id': origin_id,
@@ -124,107 +303,44 @@ async def get_info(
     await page.keyboard.press('Enter')
     await page.evaluate('''(selector) => document.querySelector(selector).click()''', "#outbound-date-input")
 
-    try:
-        cite_ver_1 = await page.waitForSelector('.departure-list', {'visible': True, 'timeout': 15000})
-        ver_1 = True
-    except Exception:
-        ver_1 = False
-
-    if ver_1:
-        try:
-            await page.waitForXPath('//*[@class="departure-list--flipper"]',
-                                    {'visible': True, 'timeout': 15000})
-        except Exception:
-            logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS 1"{ENDE}')
-
-            return {
-                'country_id': country_id,
-                'origin_id': origin_id,
-                'destination_id': destination_id,
-
-                'data': [],
-                'total_size': total_size,
-                'order': order,
-                'hash_id': hash_id,
-                'status': 400  # No data found
-            }
-        all_items = await page.xpath('//div[@data-portal-key="portal"]')
-
-        list_dict = []
-
-        for item in all_items:
-            price = await item.querySelector('div.departure-card--price')
-            times = await item.querySelectorAll('.text-std.text-right')
-            dep_time = times[0]
-            arr_time = times[1]
-
-            price_text = await page.evaluate('(element) => element.textContent', price)
-            dep_time_text = await page.evaluate('(element) => element.textContent', dep_time)
-            arr_time_text = await page.evaluate('(element )=> element.textContent', arr_time)
-
-            list_dict.append({
-                'date': date,
-                'departure_time': dep_time_text.strip(),
-                'arrival_time': arr_time_text.strip(),
-                'price': price_text.strip().replace('\xa0', ' ')
-            })
-
-        total_data = {
+    list_dict = await extract_results(page, date, logger)
+    if list_dict is None:
+        return {
             'country_id': country_id,
             'origin_id': origin_id,
             'destination_id': destination_id,
 
-            'data': list_dict,
+            'data': [],
             'total_size': total_size,
             'order': order,
             'hash_id': hash_id,
-            'status': 200  # Success
+            'status': 400  # No data found
         }
-        return total_data
+    learn_results(page, 'busbud.com', origin_id, destination_id, date_, '%Y-%m-%d', started)
+    remember_stations(page.url, origin_id, destination_id)
 
-    else:
-        try:
-            all_items = await page.waitForXPath('//*[@data-cy="departure-card"]', {'visible': True, 'timeout': 15000})
-        except TimeoutError:
-            logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS 2"{ENDE}')
+    total_data = {
+        'country_id': country_id,
+        'origin_id': origin_id,
+        'destination_id': destination_id,
 
-            return {
-                'country_id': country_id,
-                'origin_id': origin_id,
-                'destination_id': destination_id,
+        'data': list_dict,
+        'total_size': total_size,
+        'order': order,
+        'hash_id': hash_id,
+        'status': 200  # Success
+    }
+    return total_data
 
-                'data': [],
-                'total_size': total_size,
-                'order': order,
-                'hash_id': hash_id,
-                'status': 400  # No data found
-            }
-        list_dict = []
-        prices = await all_items.xpath('//*[@data-cy="displayed-price"]')
-        times = await all_items.xpath('//span[contains(text(),":")]')
-
-        times_txt = [await page.evaluate('(element) => element.textContent', time) for time in times]
-        prices_text = [await page.evaluate('(element) => element.textContent', price) for price in prices]
-        dep_times_text = times_txt[0::2]
-        arr_times_text = times_txt[1::2]
-
-        for price, dep_time, arr_time in zip(prices_text, dep_times_text, arr_times_text):
-            list_dict.append({
-                'date': date,
-                'departure_time': dep_time,
-                'arrival_time': arr_time,
-                'price': price.strip().replace('\xa0', ' ')
-            })
-
-        total_data = {
-            'country_id': country_id,
-            'origin_id': origin_id,
-            'destination_id': destination_id,
 
-            'data': list_dict,
-            'total_size': total_size,
-            'order': order,
-            'hash_id': hash_id,
-            'status': 200  # Success
-        }
-        return total_data
+DATE_STEP = DateStep('#outbound-date-input', '%Y-%m-%d', None,
+                     '//div[@data-portal-key="portal"] | //*[@data-cy="departure-card"]', extract_results)
+
+
+def get_info_dates(page: Page, country_id: int, origin: str, origin_id: int, destination: str, destination_id: int,
+                   total_size: int, hash_id: str, order: int, dates: List[str], logger: Logger) -> AsyncIterator[Dict]:
+    """
+    Same as get_info for several dates of one route, streaming one result dict per date.
+    """
+    return batching.get_info_dates(get_info, DATE_STEP, page, country_id, origin, origin_id, destination,
+                                   destination_id, total_size, hash_id, order, dates, logger)
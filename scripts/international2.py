@@ -1,9 +1,50 @@
+import time
 from datetime import datetime
 from pyppeteer.page import PageError, Page
 from pyppeteer.errors import TimeoutError
 from logging import Logger
 from configurations.settings import DARK_PURPLE, ENDE, INBOX, LIGHT_BLUE
-from typing import Dict
+from typing import Dict, List, Optional
+from scripts.utils.extraction import extract_columns
+from scripts.utils.interception import intercept
+from scripts.utils.session_state import Consent, session_state
+from scripts.utils.urls import learn_results, open_results
+
+CONSENT = Consent('#gdpr-c-acpt', '#gdpr-c-acpt', timeout=30000)
+
+
+async def extract_results(page: Page, date: str, logger: Logger) -> Optional[List[Dict]]:
+    """
+    Waits for the search results and their prices and reads them.
+    :return: Data rows, None when the search has no results.
+    """
+    list_dict = []
+    currency = '€'
+    try:
+        await page.waitForXPath('//*[@id="searchResults"]', {'visible': True, 'timeout': 50000})
+    except TimeoutError:
+        logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS"{ENDE}')
+        return None
+    try:
+        await page.waitForXPath('//div/div/span[contains(@class,"pricePrefix")]', {'visible': True, 'timeout': 50000})
+    except Exception:
+        logger.error('Timeout')
+
+    columns = await extract_columns(page, {
+        'time_departure': '//div[contains(@class,"time departure")]',
+        'time_arrival': '//div[contains(@class,"time arrival")]',
+        'price': f'//div/span[contains(text(),"{currency}")]',
+    })
+
+    for (dep_time_txt, arr_time_txt, price_txt) in zip(columns['time_departure'], columns['time_arrival'],
+                                                      columns['price']):
+        list_dict.append({
+            'date': date,
+            'departure_time': dep_time_txt,
+            'arrival_time': arr_time_txt,
+            'price': price_txt.strip()
+        })
+    return list_dict
 
 
 async def get_info(
@@ -37,11 +78,25 @@ async def get_info(
     '''
         Correcting input data
     '''
-    list_dict = []
-    currency = '€'
+    restored = await session_state.restore(page, 'checkmybus.de', CONSENT)
+    list_dict = await open_results(page, 'checkmybus.de', origin_id, destination_id, date, extract_results, logger)
+    if list_dict is not None:
+        return {
+            'country_id': country_id,
+            'origin_id': origin_id,
+            'destination_id': destination_id,
 
+            'data': list_dict,
+            'total_size': total_size,
+            'order': order,
+            'hash_id': hash_id,
+            'status': 200  # Success
+        }
+
+    started = time.monotonic()
     date_ = datetime.fromisoformat(date)
     date_ = date_.strftime('%d.%m.%Y')
+    await intercept(page, 'checkmybus.de')
     try:
         await page.goto('https://www.checkmybus.de/', timeout=90000)
     except (TimeoutError, PageError):
@@ -50,12 +105,7 @@ async def get_info(
     '''
         Checking of cookies
     '''
-    cookies_frame = page.frames[0]
-    try:
-        await cookies_frame.waitForSelector('#gdpr-c-acpt', {'visible': True})
-        await cookies_frame.evaluate('''(selector) => document.querySelector(selector).click()''', "#gdpr-c-acpt")
-    except TimeoutError:
-        logger.error(f'{DARK_PURPLE}Cookies not found {ENDE}{INBOX}{LIGHT_BLUE}"#gdpr-c-acpt ..."{ENDE}')
+    await session_state.consent(page, 'checkmybus.de', CONSENT, restored, logger)
 
     '''
         Locate Fields
@@ -124,10 +174,8 @@ async def get_info(
 
     await page.evaluate('''(selector) => document.querySelector(selector).click()''', "#execSearch")
 
-    try:
-        await page.waitForXPath('//*[@id="searchResults"]', {'visible': True, 'timeout': 50000})
-    except TimeoutError:
-        logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS"{ENDE}')
+    list_dict = await extract_results(page, date, logger)
+    if list_dict is None:
         return {
             'country_id': country_id,
             'origin_id': origin_id,
@@ -139,25 +187,7 @@ async def get_info(
             'hash_id': hash_id,
             'status': 400  # No data found
         }
-    try:
-        await page.waitForXPath('//div/div/span[contains(@class,"pricePrefix")]', {'visible': True, 'timeout': 50000})
-    except Exception:
-        logger.error('Timeout')
-
-    time_departure = await page.xpath('//div[contains(@class,"time departure")]')
-    time_arrival = await page.xpath('//div[contains(@class,"time arrival")]')
-
-    price = await page.xpath(f'//div/span[contains(text(),"{currency}")]')
-    for (i, k, p) in zip(time_departure, time_arrival, price):
-        dep_time_txt = await page.evaluate('(element) => element.textContent', i)
-        arr_time_txt = await page.evaluate('(element) => element.textContent', k)
-        price_txt = await page.evaluate('(element) => element.textContent', p)
-        list_dict.append({
-            'date': date,
-            'departure_time': dep_time_txt,
-            'arrival_time': arr_time_txt,
-            'price': price_txt.strip()
-        })
+    learn_results(page, 'checkmybus.de', origin_id, destination_id, date_, '%d.%m.%Y', started)
 
     total_data = {
         'country_id': country_id,
@@ -1,9 +1,46 @@
+import time
 from datetime import datetime
 from pyppeteer.page import PageError, Page
 from pyppeteer.errors import TimeoutError
 from logging import Logger
 from configurations.settings import DARK_PURPLE, ENDE, INBOX, LIGHT_BLUE
-from typing import Dict
+from typing import Dict, List, Optional
+from scripts.utils.extraction import extract_columns
+from scripts.utils.interception import intercept
+from scripts.utils.session_state import Consent, session_state
+from scripts.utils.urls import learn_results, open_results
+
+CONSENT = Consent('#CybotCookiebotDialogBody', '#CybotCookiebotDialogBodyButtonAccept', cookie='CookieConsent',
+                  timeout=50000)
+
+
+async def extract_results(page: Page, date: str, logger: Logger) -> Optional[List[Dict]]:
+    """
+    Waits for the journey planner results and reads them.
+    :return: Data rows, None when the search has no results.
+    """
+    try:
+        await page.waitForXPath('//div[contains(@class,"lyr_itemResults")]', {'visible': True, 'timeout': 50000})
+    except TimeoutError:
+        logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS"{ENDE}')
+        return None
+    list_dict = []
+    columns = await extract_columns(page, {
+        'times': '//div/div[contains(@class,"lyr_timeRow lyr_plantime")]',
+        'prices': '//div/div/span[contains(@class,"lyr_bigValue")]',
+    })
+    departure_time = columns['times']
+    price = columns['prices']
+    arrival_time = departure_time[1::2]
+    departure_time = departure_time[::2]
+    for d, a, p in zip(departure_time, arrival_time, price):
+        list_dict.append({
+            'date': date,
+            'departure_time': d,
+            'arrival_time': a,
+            'price': p
+        })
+    return list_dict
 
 
 async def get_info(
@@ -35,22 +72,31 @@ async def get_info(
     :return: Dict
     """
 
-    departure_time = []
-    price = []
+    await page.setViewport({'width': 1280, 'height': 1600})
+    restored = await session_state.restore(page, 'irishrail.ie', CONSENT)
+    list_dict = await open_results(page, 'irishrail.ie', origin_id, destination_id, date, extract_results, logger)
+    if list_dict is not None:
+        return {
+            'country_id': country_id,
+            'origin_id': origin_id,
+            'destination_id': destination_id,
+
+            'data': list_dict,
+            'total_size': total_size,
+            'order': order,
+            'hash_id': hash_id,
+            'status': 200  # Success
+        }
+
+    started = time.monotonic()
     date_ = datetime.fromisoformat(date)
     date_ = date_.strftime('%d/%m/%Y')
-    list_dict = []
-    await page.setViewport({'width': 1280, 'height': 1600})
+    await intercept(page, 'irishrail.ie')
     try:
         await page.goto('https://www.irishrail.ie/', timeout=90000)
     except (TimeoutError, PageError):
         logger.error(f'{DARK_PURPLE}Page either crushed or time exceeded{ENDE}')
-    try:
-        await page.waitForXPath('//*[@id="CybotCookiebotDialogBody"]', {'visible': True, 'timeout': 50000})
-        await page.evaluate('''(selector) => document.querySelector(selector).click()''',
-                            "#CybotCookiebotDialogBodyButtonAccept")
-    except TimeoutError:
-        logger.error(f'{DARK_PURPLE}Could not locate {ENDE}{INBOX}{LIGHT_BLUE}"XPATH=//*[@id="CybotCookiebotDialogBody"] ..."{ENDE}')
+    await session_state.consent(page, 'irishrail.ie', CONSENT, restored, logger)
 
     try:
         await page.waitForXPath('//*[@id="HFS_from"]', {'visible': True, 'timeout': 50000})
@@ -91,10 +137,8 @@ async def get_info(
     await page.type('#HFS_date_REQ0', date_)
     await page.evaluate('''(selector) => document.querySelector(selector).click()''',
                         "#HafasQueryForm > div.f02__cta > button")
-    try:
-        await page.waitForXPath('//div[contains(@class,"lyr_itemResults")]', {'visible': True, 'timeout': 50000})
-    except TimeoutError:
-        logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS"{ENDE}')
+    list_dict = await extract_results(page, date, logger)
+    if list_dict is None:
         return {
             'country_id': country_id,
             'origin_id': origin_id,
@@ -106,23 +150,7 @@ async def get_info(
             'hash_id': hash_id,
             'status': 400  # No data found
         }
-    dep_time = await page.xpath('//div/div[contains(@class,"lyr_timeRow lyr_plantime")]')
-    prices = await page.xpath('//div/div/span[contains(@class,"lyr_bigValue")]')
-    for i in dep_time:
-        dp_time_txt = await page.evaluate('(element) => element.textContent', i)
-        departure_time.append(dp_time_txt)
-    arrival_time = departure_time[1::2]
-    departure_time = departure_time[::2]
-    for p in prices:
-        prices_txt = await page.evaluate('(element) => element.textContent', p)
-        price.append(prices_txt)
-    for d, a, p in zip(departure_time, arrival_time, price):
-        list_dict.append({
-            'date': date,
-            'departure_time': d,
-            'arrival_time': a,
-            'price': p
-        })
+    learn_results(page, 'irishrail.ie', origin_id, destination_id, date_, '%d/%m/%Y', started)
     total_data = {
         'country_id': country_id,
         'origin_id': origin_id,
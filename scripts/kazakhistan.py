@@ -1,10 +1,13 @@
-from google_trans_new import google_translator
 from datetime import datetime
 from pyppeteer.page import PageError, Page
 from pyppeteer.errors import TimeoutError
 from logging import Logger
 from configurations.settings import DARK_PURPLE, ENDE, INBOX, LIGHT_BLUE
 from typing import Dict
+from scripts.utils.aliases import localize, pick_option
+from scripts.utils.extraction import extract_rows
+from scripts.utils.interception import intercept
+from scripts.utils.waiting import wait_first
 
 async def get_info(
         page: Page,
@@ -37,11 +40,11 @@ async def get_info(
         Correcting input data
     '''
 
-    translator = google_translator()
-    origin = translator.translate(origin, lang_src='en', lang_tgt='ru').strip()
-    destination = translator.translate(destination, lang_src='en', lang_tgt='ru').strip()
+    origin = await localize('railways.kz', origin_id, origin)
+    destination = await localize('railways.kz', destination_id, destination)
     date_ = datetime.fromisoformat(date)
     date_ = date_.strftime("%d-%m-%Y")
+    await intercept(page, 'railways.kz')
     try:
         await page.goto('https://bilet.railways.kz/', timeout=90000)
     except (TimeoutError, PageError):
@@ -62,8 +65,11 @@ async def get_info(
     try:
         hint_city = await page.waitForXPath(f'//div[@data-text="{origin.upper()}"]',
                                             {'visible': True, 'timeout': 5000})
-        await hint_city.click()
     except TimeoutError:
+        hint_city = await pick_option(page, '//div[@data-text]', origin)
+    if hint_city:
+        await hint_city.click()
+    else:
         logger.error(
             f'{DARK_PURPLE}Departure City {ENDE}{INBOX}{LIGHT_BLUE}"Is Not Valid ..."{ENDE}')
         return {
@@ -91,8 +97,11 @@ async def get_info(
     try:
         hint_city = await page.waitForXPath(f'//div[@data-text="{destination.upper()}"]',
                                             {'visible': True, 'timeout': 5000})
-        await hint_city.click()
     except TimeoutError:
+        hint_city = await pick_option(page, '//div[@data-text]', destination)
+    if hint_city:
+        await hint_city.click()
+    else:
         logger.error(
             f'{DARK_PURPLE}Arrival City {ENDE}{INBOX}{LIGHT_BLUE}"Is Not Valid ..."{ENDE}')
         return {
@@ -123,10 +132,13 @@ async def get_info(
 
     await page.evaluate('''(selector) => document.querySelector(selector).click()''',
                         '[name="route_search_form"] > button')
-    try:
-        await page.waitForXPath('//div[@class="ui existing segment"]', {'visible': True, 'timeout': 50000})
-    except TimeoutError:
-        logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS"{ENDE}')
+    result = await wait_first(page, {
+        'results': '//div[@class="ui existing segment"]',
+        'no_trains': ('.ui.message, .ui.warning, p', 'не найден'),
+        'error': '.ui.negative.message, .ui.error.message',
+    }, timeout=50000)
+    if result != 'results':
+        logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS ({result})"{ENDE}')
         return {
             'country_id': country_id,
             'origin_id': origin_id,
@@ -145,24 +157,20 @@ async def get_info(
         logger.error('Tikets not found')
         
 
-    all_items = await page.xpath('//tr[contains(@class, "item")]')
+    all_items = await extract_rows(page, '//tr[contains(@class, "item")]', {
+        'price': 'h4.ui.apple.header',
+        'dep_time': 'h2.departure-time',
+        'arr_time': 'h2.arrival-time',
+    })
 
     list_dict = []
 
     for item in all_items:
-        price = await item.querySelector('h4.ui.apple.header')
-        dep_time = await item.querySelector('h2.departure-time')
-        arr_time = await item.querySelector('h2.arrival-time')
-
-        price_text = await page.evaluate('(element) => element.textContent', price)
-        dep_time_text = await page.evaluate('(element) => element.textContent', dep_time)
-        arr_time_text = await page.evaluate('(element) => element.textContent', arr_time)
-
         list_dict.append({
             'date': date,
-            'departure_time': dep_time_text.strip()[:5],
-            'arrival_time': arr_time_text.strip()[:5],
-            'price': price_text.strip().replace('\xa0', ' '),
+            'departure_time': item['dep_time'].strip()[:5],
+            'arrival_time': item['arr_time'].strip()[:5],
+            'price': item['price'].strip().replace('\xa0', ' '),
         })
 
     total_data = {
@@ -4,15 +4,16 @@ from pyppeteer.errors import TimeoutError
 from logging import Logger
 from configurations.settings import DARK_PURPLE, ENDE, INBOX, LIGHT_BLUE
 from typing import Dict
+from scripts.utils.extraction import extract_columns
+from scripts.utils.interception import intercept
 
 
 async def get_info(page, country_id, origin, origin_id, destination, destination_id, total_size, hash_id, order, date,
                    logger: Logger) -> Dict:
-    dep_times = []
-    prices = []
     date_ = datetime.fromisoformat(date)
     date_ = date_.strftime('%m/%d/%Y')
     list_dict = []
+    await intercept(page, 'metickets.krc.co.ke')
     try:
         await page.goto('https://metickets.krc.co.ke/', timeout=50000)
     except (TimeoutError, PageError):
@@ -73,16 +74,14 @@ async def get_info(page, country_id, origin, origin_id, destination, destination
             'hash_id': hash_id,
             'status': 400  # No data found
         }
-    times = await page.xpath('//div/small/span[contains(@class,"span")]')
-    price = await page.xpath('//div[2]/div[1]/dl/dd[contains(text(),"KSH")]')
-    for i in times:
-        time_txt = await page.evaluate('(element) => element.textContent', i)
-        dep_times.append(time_txt)
+    columns = await extract_columns(page, {
+        'times': '//div/small/span[contains(@class,"span")]',
+        'prices': '//div[2]/div[1]/dl/dd[contains(text(),"KSH")]',
+    })
+    dep_times = columns['times']
+    prices = columns['prices']
     departure_times = dep_times[::2]
     arrival_times = dep_times[1::1]
-    for p in price:
-        price_txt = await page.evaluate('(element) => element.textContent', p)
-        prices.append(price_txt)
     for d, a, p in zip(departure_times, arrival_times, prices):
         list_dict.append({
             'date': date,
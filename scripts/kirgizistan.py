@@ -2,43 +2,183 @@ import pandas as pd
 import requests
 from bs4 import BeautifulSoup
 import json
-from google_trans_new import google_translator
-from typing import Dict
-from logging import Logger
-import pickle
+import re
+import threading
+import time
+from scripts.utils.aliases import localize_sync
+from typing import Dict, List, Optional
+from logging import Logger, getLogger
 import os
 
+ROUTES_URL = 'https://avtobeket.kg/routes/'
+ROUTES_PICKLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pickles', 'avtobeket.pickle')
+ROUTES_META = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pickles', 'avtobeket.meta.json')
+ROUTES_TTL = 24 * 60 * 60  # Seconds before the route table is revalidated against avtobeket.kg
+
+_DASHES = re.compile(r'\s*[-–—]\s*')
+
+'''
+    Header texts (casefolded) of the row fields in the avtobeket.kg route table:
+    № | Маршруты | Время отправление | Перевозчик | Стоимость проезда, сом
+'''
+ROUTE_HEADERS = {'departure_time': 'время', 'price': 'стоимость'}
+_DEPARTURE = re.compile(r'(\d{1,2})\s*[-:.]\s*(\d{2})')
+
+
+def route_key(route: str) -> str:
+    """
+    "Бишкек – Ош", "Бишкек-Ош" and "бишкек — ош" all give the same key.
+    """
+    return _DASHES.sub('-', ' '.join(str(route).split())).casefold()
+
+
+class RouteTable:
+    """
+    The avtobeket.kg route table, loaded once per process and indexed by route_key of its route column.
+    After ROUTES_TTL it is revalidated with a conditional request (ETag / If-Modified-Since).
+    Thread safe: get_info runs in executor threads, one of them revalidates while the others wait for it.
+    """
+
+    def __init__(self, pickle_path: str = ROUTES_PICKLE, meta_path: str = ROUTES_META, ttl: float = ROUTES_TTL):
+        self.pickle_path = pickle_path
+        self.meta_path = meta_path
+        self.ttl = ttl
+        self.table: Optional[pd.DataFrame] = None
+        self.index: Dict[str, List[int]] = {}
+        self.meta: Dict = {}
+        self.fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _build_index(table: pd.DataFrame) -> Dict[str, List[int]]:
+        index = {}
+        for position, route in enumerate(table[1]):
+            index.setdefault(route_key(route), []).append(position)
+        return index
+
+    def _load_local(self) -> bool:
+        try:
+            table = pd.read_pickle(self.pickle_path)
+            fetched_at = os.path.getmtime(self.pickle_path)
+        except (OSError, ValueError):
+            return False
+        try:
+            with open(self.meta_path) as meta_file:
+                self.meta = json.load(meta_file)
+        except (OSError, ValueError):
+            self.meta = {}
+        self.table, self.index, self.fetched_at = table, self._build_index(table), fetched_at
+        return True
+
+    def _refresh(self, logger: Logger):
+        headers = {}
+        if self.table is not None:
+            if self.meta.get('etag'):
+                headers['If-None-Match'] = self.meta['etag']
+            if self.meta.get('last_modified'):
+                headers['If-Modified-Since'] = self.meta['last_modified']
+        try:
+            res = requests.get(ROUTES_URL, headers=headers, timeout=30)
+        except requests.RequestException as error:
+            logger.error(f'avtobeket.kg routes could not be fetched: {error}')
+            return
+
+        if res.status_code == 304:
+            self.fetched_at = time.time()
+            os.utime(self.pickle_path)
+            return
+        if res.status_code != 200:
+            logger.error(f'avtobeket.kg routes answered {res.status_code}')
+            return
+
+        soup = BeautifulSoup(res.content, 'lxml')
+        try:
+            bus_routes_table = soup.find_all('table')[1]
+            df2 = pd.read_html(str(bus_routes_table))[0]
+            df2 = df2.dropna(subset=[1])
+        except (IndexError, KeyError, ValueError) as error:
+            logger.error(f'avtobeket.kg routes table not found, the page layout changed: {error!r}')
+            return
+        os.makedirs(os.path.dirname(self.pickle_path), exist_ok=True)
+        df2.to_pickle(self.pickle_path, compression='infer', protocol=5)
+        self.meta = {'etag': res.headers.get('ETag'), 'last_modified': res.headers.get('Last-Modified')}
+        with open(self.meta_path, 'w') as meta_file:
+            json.dump(self.meta, meta_file)
+
+        self.table, self.index, self.fetched_at = df2, self._build_index(df2), time.time()
+
+    def _stale(self) -> bool:
+        return self.table is None or time.time() - self.fetched_at > self.ttl
+
+    def ensure_fresh(self, logger: Logger):
+        if not self._stale():
+            return
+        with self._lock:
+            '''
+                Checked again: another thread may have revalidated while this one waited
+            '''
+            if self.table is None:
+                self._load_local()
+            if self._stale():
+                self._refresh(logger)
+
+    def columns(self) -> Optional[Dict[str, int]]:
+        """
+        Column of every ROUTE_HEADERS field, read from the header row of the table; None when one is missing.
+        """
+        if self.table is None or self.table.empty:
+            return None
+        header = {column: str(text).casefold() for column, text in self.table.iloc[0].items()}
+        columns = {}
+        for field, wanted in ROUTE_HEADERS.items():
+            column = next((column for column, text in header.items() if wanted in text), None)
+            if column is None:
+                return None
+            columns[field] = column
+        return columns
+
+    def lookup(self, origin: str, destination: str, logger: Logger) -> pd.DataFrame:
+        self.ensure_fresh(logger)
+        with self._lock:
+            table, index = self.table, self.index
+        if table is None:
+            return pd.DataFrame()
+        return table.iloc[index.get(route_key(origin + '-' + destination), [])]
+
+
+routes = RouteTable()
+
+
+def to_rows(data: pd.DataFrame, date: str, logger: Optional[Logger] = None) -> Optional[List[Dict]]:
+    """
+    The rows of get_info's DataFrame in the shape of the other scrapers' list_dict, one row per departure
+    ("8-00.9-00, 11-30" holds three). The route table has no arrival times.
+    :return: None when the table does not have the expected columns (the layout of the site changed).
+    """
+    columns = routes.columns()
+    if columns is None or any(column not in data.columns for column in columns.values()):
+        (logger or getLogger(__name__)).error(f'avtobeket.kg route table has no {sorted(ROUTE_HEADERS)} columns')
+        return None
+    list_dict = []
+    for departures, price in zip(data[columns['departure_time']], data[columns['price']]):
+        price_text = '' if pd.isna(price) else str(price).strip()
+        for hours, minutes in _DEPARTURE.findall('' if pd.isna(departures) else str(departures)):
+            list_dict.append({
+                'date': date,
+                'departure_time': f'{int(hours):02d}:{minutes}',
+                'arrival_time': '',
+                'price': price_text,
+            })
+    return list_dict
+
 
 def get_info(origin: str, destination: str,
              page=None, country_id: int = None,
              origin_id: int = None, destination_id: int = None,
              total_size: int = None, hash_id: str = None,
              order: int = None, date: str = None, logger: Logger = None) -> Dict:
-    translator = google_translator()
-    translated_origin = translator.translate(origin, lang_src='en', lang_tgt='ru')
-    translated_dest = translator.translate(destination, lang_src='en', lang_tgt='ru')
+    translated_origin = localize_sync('avtobeket.kg', origin_id, origin)
+    translated_dest = localize_sync('avtobeket.kg', destination_id, destination)
 
-    if not os.path.isdir('./pickles/avtobeket.pickle'):
-        res = requests.get("https://avtobeket.kg/routes/")
-        soup = BeautifulSoup(res.content, 'lxml')
-        bus_routes_table = soup.find_all('table')[1]
-        df2 = pd.read_html(str(bus_routes_table))[0]
-        pd.set_option("display.max_rows", None, "display.max_columns", None)
-        df2.to_latex(index=False)
-        df2 = df2.dropna(subset=[1])
-        df2.to_pickle('avtobeket.pickle', compression='infer', protocol=5)
-        data = df2.loc[
-            (df2[1] ==
-             translated_origin + " – " + translated_dest) |
-            (df2[1] == translated_origin + "-" + translated_dest) |
-            (df2[1] == translated_origin + " — " + translated_dest)
-            ]
-    else:
-        df = pd.read_pickle('pickles/avtobeket.pickle')
-        data = df.loc[
-            (df[1] ==
-             translated_origin + " – " + translated_dest) |
-            (df[1] == translated_origin + "-" + translated_dest) |
-            (df[1] == translated_origin + " — " + translated_dest)
-            ]
+    data = routes.lookup(translated_origin, translated_dest, logger or getLogger(__name__))
     return data
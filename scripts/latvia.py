@@ -1,10 +1,13 @@
-from google_trans_new import google_translator
 from datetime import datetime
 from pyppeteer.page import PageError, Page
 from pyppeteer.errors import TimeoutError
 from logging import Logger
 from configurations.settings import DARK_PURPLE, ENDE, INBOX, LIGHT_BLUE
 from typing import Dict
+from scripts.utils.aliases import localize, pick_option
+from scripts.utils.datepicker import set_date
+from scripts.utils.extraction import extract_columns
+from scripts.utils.interception import intercept
 
 
 async def get_info(
@@ -37,16 +40,12 @@ async def get_info(
     '''
         Correcting input data
     '''
-    departure_time = []
-    arrival_time = []
-    prices = []
     list_dict = []
-    translator = google_translator()
-    origin = translator.translate(origin, lang_tgt='lv').strip()
-    destination = translator.translate(
-        destination, lang_tgt='lv').strip()
+    origin = await localize('pv.lv', origin_id, origin)
+    destination = await localize('pv.lv', destination_id, destination)
     date_ = datetime.fromisoformat(date)
     date_ = date_.strftime('%d.%m.%Y')
+    await intercept(page, 'pv.lv')
     try:
         await page.goto('https://www.pv.lv/en/', timeout=90000)
     except (TimeoutError, PageError):
@@ -62,10 +61,13 @@ async def get_info(
 
     await page.evaluate('''(selector) => document.querySelector(selector).click()''', "#from-station")
     await page.type('[id=from-station]', origin)
-    try: 
-        option = await page.waitForXPath(f'//ul/li[contains(text(),"{origin}")]',{'visible': True, 'timeout': 10000}) 
-        await option.click() 
-    except Exception: 
+    try:
+        option = await page.waitForXPath(f'//ul/li[contains(text(),"{origin}")]',{'visible': True, 'timeout': 10000})
+    except Exception:
+        option = await pick_option(page, '//ul/li', origin)
+    if option:
+        await option.click()
+    else:
         logger.error(f'{DARK_PURPLE} No valid origin {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS"{ENDE}')
         return {
             'country_id': country_id,
@@ -86,10 +88,13 @@ async def get_info(
 
     await page.evaluate('''(selector) => document.querySelector(selector).click()''', "#to-station")
     await page.type('[id=to-station]', destination)
-    try: 
-        option2 = await page.waitForXPath(f'//ul/li[contains(text(),"{destination}")]',{'visible': True, 'timeout': 10000}) 
-        await option2.click() 
-    except Exception: 
+    try:
+        option2 = await page.waitForXPath(f'//ul/li[contains(text(),"{destination}")]',{'visible': True, 'timeout': 10000})
+    except Exception:
+        option2 = await pick_option(page, '//ul/li', destination)
+    if option2:
+        await option2.click()
+    else:
         logger.error(f'{DARK_PURPLE} No valid destination {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS"{ENDE}')
         return {
             'country_id': country_id,
@@ -109,11 +114,8 @@ async def get_info(
     date_ = date_.replace("-", ".")
     try:
         await page.waitForXPath('//*[@id="switch-date-f"]', {'visible': True, 'timeout': 50000})
-        await page.evaluate('''(selector) => document.querySelector(selector).removeAttribute("readonly")''',
-                            "#switch-date-f")
-        await page.click('[id=switch-date-f]', {'clickCount': 3})
-        await page.keyboard.press('Backspace')
-        await page.type('#switch-date-f', date_)
+        await set_date(page, '#switch-date-f', date_)
+        await page.focus('#switch-date-f')
         await page.keyboard.press('Enter')
 
     except Exception:
@@ -138,24 +140,15 @@ async def get_info(
             'status': 400  # No data found
         }
         
-    dep_time = await page.xpath('//div/div[contains(@class,"col-3 col-time")]')
-    arr_time = await page.xpath('//div/div[contains(@class,"col-4 col-time")]')
-    price = await page.xpath('//div/div[contains(@class,"col-6 col-ticket-price")]')
-    for i in dep_time:
-        dp_time_txt = await page.evaluate('(element) => element.textContent', i)
-        departure_time.append(dp_time_txt)
-    del departure_time[0]
-
-    for a in arr_time:
-        ar_time_txt = await page.evaluate('(element) => element.textContent', a)
-        arrival_time.append(ar_time_txt)
-    del arrival_time[0]
+    columns = await extract_columns(page, {
+        'dep_time': '//div/div[contains(@class,"col-3 col-time")]',
+        'arr_time': '//div/div[contains(@class,"col-4 col-time")]',
+        'price': '//div/div[contains(@class,"col-6 col-ticket-price")]',
+    })
+    departure_time = columns['dep_time'][1:]
+    arrival_time = columns['arr_time'][1:]
 
-    for p in price:
-        price_txt = await page.evaluate('(element) => element.textContent', p)
-        prices.append(price_txt)
-        prices = [x.replace('\n', '') for x in prices]
-        prices = [x.strip('   ') for x in prices]
+    prices = [x.replace('\n', '').strip('   ') for x in columns['price']]
     del prices[0]
     prices = [x[-6:] for x in prices]
     for d, a, p in zip(departure_time, arrival_time, prices):
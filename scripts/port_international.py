@@ -1,9 +1,15 @@
-from datetime import datetime
 from pyppeteer.page import PageError
 from pyppeteer.errors import TimeoutError
 from logging import Logger
 from configurations.settings import DARK_PURPLE, ENDE, INBOX, LIGHT_BLUE
 from typing import Dict
+from scripts.utils.datepicker import CalendarDriver
+from scripts.utils.extraction import extract_columns
+from scripts.utils.interception import intercept
+from scripts.utils.session_state import Consent, session_state
+
+CONSENT = Consent('//*[@id="Home"]/div[6]/div/a', '//*[@id="Home"]/div[6]/div/a')
+CALENDAR = CalendarDriver('//div[@data-full="{date}"]', '//div[@aria-label="Next Month"]', '%Y-%-m-%-d')
 
 
 async def get_info(page, country_id, origin, origin_id, destination, destination_id, total_size, hash_id, order, date,
@@ -23,23 +29,16 @@ async def get_info(page, country_id, origin, origin_id, destination, destination
     :param total_size: How many splits we need to collect before being sure that whole data is actually processed.
     :return: Dict
     """
-    dep_infos = []
-    prices = []
     list_dict = []
     car = "A4 Avant (2008 +)"
-    date_ = datetime.fromisoformat(date)
-    date_ = date_.strftime('%Y-%-m-%-d')
+    await intercept(page, 'directferries.de')
+    restored = await session_state.restore(page, 'directferries.de', CONSENT)
     try:
         await page.goto('https://www.directferries.de/', timeout=90000)
     except (TimeoutError, PageError):
         logger.error(f'{DARK_PURPLE}Page either crushed or time exceeded{ENDE}')
 
-    try:
-        cookie = await page.waitForXPath('//*[@id="Home"]/div[6]/div/a', {'visible': True, 'timeout': 10000})
-        await cookie.click()
-    except TimeoutError:
-        logger.error(
-            f'{DARK_PURPLE}Could not locate {ENDE}{INBOX}{LIGHT_BLUE}"XPATH=//*[@id="deal_finder1"]/div/section/label ..."{ENDE}')
+    await session_state.consent(page, 'directferries.de', CONSENT, restored, logger)
 
     try:
         await page.waitForXPath('//*[@id="deal_finder1"]/div/section/label', {'visible': True, 'timeout': 10000})
@@ -68,24 +67,18 @@ async def get_info(page, country_id, origin, origin_id, destination, destination
 
     await page.evaluate('''(selector) => document.querySelector(selector).click()''',
                         "#deal_finder1 > div.deal_finder_wrap > section.journey_timing.timing_outbound.hide_until_times")
-    date_wanted = None
-    while True:
-        try:
-            date_wanted = await page.waitForXPath(f'//div[@data-full="{date_}"]', timeout=1000)
-        except TimeoutError:
-            logger.error(
-                f'{DARK_PURPLE} {date_} Could not locate {ENDE}{INBOX}{LIGHT_BLUE}"XPATH=//div[@data-full=..."{ENDE}')
-
-        if date_wanted:
-            await date_wanted.click()
-            break
-        else:
-            try:
-                next_button = await page.waitForXPath('//div[@aria-label="Next Month"]')
-                await next_button.click()
-            except TimeoutError:
-                logger.error(
-                    f'{DARK_PURPLE}Could not locate {ENDE}{INBOX}{LIGHT_BLUE}"XPATH=//div[@aria-label="Next Month"]..."{ENDE}')
+    if not await CALENDAR.pick(page, date, logger):
+        return {
+            'country_id': country_id,
+            'origin_id': origin_id,
+            'destination_id': destination_id,
+
+            'data': [],
+            'total_size': total_size,
+            'order': order,
+            'hash_id': hash_id,
+            'status': 400  # No data found
+        }
 
     try:
         await page.waitForXPath('//*[@id="deal_finder1"]/div/button', {'visible': True, 'timeout': 10000})
@@ -174,22 +167,16 @@ async def get_info(page, country_id, origin, origin_id, destination, destination
             'hash_id': hash_id,
             'status': 400  # No data found
         }
-    dep_info = await page.xpath('//div/div[contains(@class,"ab-2062-col-1")]')
-    price = await page.xpath('//div/div/b')
-    for d in dep_info:
-        dep_info_txt = await page.evaluate('(element) => element.textContent', d)
-        dep_infos.append(dep_info_txt)
-        dep_infos = [x.replace('\n', '') for x in dep_infos]
-        dep_infos = [x.strip(' ') for x in
-                     dep_infos]
+    columns = await extract_columns(page, {
+        'dep_info': '//div/div[contains(@class,"ab-2062-col-1")]',
+        'price': '//div/div/b',
+    })
+    dep_infos = [x.replace('\n', '').strip(' ') for x in columns['dep_info']]
     del dep_infos[1::3]
     times = [x[75:90] for x in dep_infos]
     dep_time = times[0::2]
     arr_time = times[1::2]
-    for p in price:
-        price_txt = await page.evaluate('(element) => element.textContent', p)
-        prices.append(price_txt)
-    prices = prices[7::4]
+    prices = columns['price'][7::4]
     for d, a, p in zip(dep_time, arr_time, prices):
         list_dict.append({
             'date': date,
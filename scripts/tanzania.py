@@ -2,11 +2,14 @@ from datetime import datetime
 from pyppeteer.page import PageError, Page
 from pyppeteer.errors import TimeoutError
 from logging import Logger
-from typing import Dict
+from typing import AsyncIterator, Dict, List
 from configurations.settings import DARK_PURPLE, ENDE, INBOX, LIGHT_BLUE
-from pyppeteer import launch
+from scripts.utils.extraction import extract_rows
+from scripts.utils.interception import intercept
+from scripts.utils.streaming import NoResults, chunks, collect
+from scripts.utils.waiting import ERROR_TOAST, wait_first
 
-async def get_info(
+async def stream_info(
         page: Page,
         country_id: int,
         origin: str,
@@ -17,21 +20,10 @@ async def get_info(
         hash_id: str,
         order: int,
         date: str,
-        logger: Logger) -> Dict:
+        logger: Logger) -> AsyncIterator[List[Dict]]:
     """
-    The Scraper which built on Pyppeteer. Finds info considering the given params.
-    :param page: Page object used to navigate in Tab of Browser.
-    :param origin: Starting point for scraping.
-    :param destination: Endpoint for scraping.
-    :param date: The date to scrape the info for.
-    :param logger: Page level logger.
-    :param country_id: ID of country being scraped. (Will be used to fetch the country form DB).
-    :param origin_id: ID of origin city. Will be used to fetch the city object.
-    :param destination_id: ID of destination city.
-    :param order: Order of the split (partial) data. (Used in ordering the total data before producing).
-    :param hash_id: Hash ID to determine to which data (the original whole data) this split belongs to.
-    :param total_size: How many splits we need to collect before being sure that whole data is actually processed.
-    :return: Dict
+    Streaming variant of get_info: the whole result table is read in one evaluate, then yielded in chunks
+    of STREAM_CHUNK rows. Raises NoResults when the search finds nothing.
     """
 
     '''
@@ -39,6 +31,7 @@ async def get_info(
     '''
     date_ = datetime.fromisoformat(date)
     date_ = date_.strftime("%Y-%m-%d")
+    await intercept(page, 'darlux.co.tz')
     try:
         await page.goto('https://www.darlux.co.tz/home.aspx', timeout=90000)
     except (TimeoutError, PageError):
@@ -65,17 +58,7 @@ async def get_info(
     except TimeoutError:
         logger.error(
             f'{DARK_PURPLE}Departure City Is Not Valid {ENDE}{INBOX}{LIGHT_BLUE}"ORIGIN"{ENDE}')
-        return {
-            'country_id': country_id,
-            'origin_id': origin_id,
-            'destination_id': destination_id,
-
-            'data': [],
-            'total_size': total_size,
-            'order': order,
-            'hash_id': hash_id,
-            'status': 400  # No data found
-        }
+        raise NoResults(origin)
 
     try:
         destination_feiled = await page.waitForXPath(
@@ -95,17 +78,7 @@ async def get_info(
     except TimeoutError:
         logger.error(
             f'{DARK_PURPLE}Arrival City Is Not Valid {ENDE}{INBOX}{LIGHT_BLUE}"DESTINATION"{ENDE}')
-        return {
-            'country_id': country_id,
-            'origin_id': origin_id,
-            'destination_id': destination_id,
-
-            'data': [],
-            'total_size': total_size,
-            'order': order,
-            'hash_id': hash_id,
-            'status': 400  # No data found
-        }
+        raise NoResults(destination)
 
     """
         choose the date of departure
@@ -121,21 +94,13 @@ async def get_info(
 
     await page.evaluate('''(selector) => document.querySelector(selector).click()''', 'button.btn-primary')
 
-    try:
-        await page.waitForXPath('//table[@id="example"]', {'visible': True, 'timeout': 50000})
-    except TimeoutError:
-        logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS"{ENDE}')
-        return {
-            'country_id': country_id,
-            'origin_id': origin_id,
-            'destination_id': destination_id,
-
-            'data': [],
-            'total_size': total_size,
-            'order': order,
-            'hash_id': hash_id,
-            'status': 400  # No data found
-        }
+    result = await wait_first(page, dict({
+        'rows': '#example #search_result tr td:nth-child(8)',
+        'empty': '#example td.dataTables_empty',
+    }, **ERROR_TOAST), timeout=50000)
+    if result != 'rows':
+        logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS ({result})"{ENDE}')
+        raise NoResults(result)
 
     try:
         await page.waitForSelector('select[name="example_length"] option[value="100"]',
@@ -143,53 +108,65 @@ async def get_info(
         await page.select('select[name="example_length"]', '100')
     except TimeoutError:
         logger.error(f'{DARK_PURPLE} Failed {ENDE}{INBOX}{LIGHT_BLUE}"to show more tickets"{ENDE}')
-    try:
-        all_items = await page.xpath('//*[@id="search_result"]/tr')
-    except TimeoutError:
-        logger.error(f'{DARK_PURPLE} Tikets {ENDE}{INBOX}{LIGHT_BLUE}"not found"{ENDE}')
+    all_items = await extract_rows(page, '//*[@id="search_result"]/tr', {
+        'second_cell': ('td', 1),
+        'price': ('td', 7),
+        'dep_time': ('td', 4),
+        'arr_time': ('td', 5),
+    })
 
     list_dict = []
 
     for item in all_items:
-        tds = await item.querySelectorAll('td')
-
-        if len(tds) > 1:
-            price = await page.evaluate('(element) => element.textContent', tds[7])
-            dep_time = await page.evaluate('(element) => element.textContent', tds[4])
-            arr_time = await page.evaluate('(element) => element.textContent', tds[5])
-
-            price_text = price.strip()
-            dep_time_text = dep_time.strip().replace(' Hrs', '')
-            arr_time_text = arr_time.strip().replace(' Hrs', '')
-
-            list_dict.append({
-                'date': date,
-                'departure_time': dep_time_text.strip(),
-                'arrival_time': arr_time_text.strip(),
-                'price': price_text.strip(),
-            })
-        else:
+        if item['second_cell'] is None:
             logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"TICKETS FOUND"{ENDE}')
-            return {
-                'country_id': country_id,
-                'origin_id': origin_id,
-                'destination_id': destination_id,
-
-                'data': [],
-                'total_size': total_size,
-                'order': order,
-                'hash_id': hash_id,
-                'status': 400  # No data found
-            }
-
-    total_data = {
-        'country_id': country_id,
-        'origin_id': origin_id,
-        'destination_id': destination_id,
-        'data': list_dict,
-        'total_size': total_size,
-        'order': order,
-        'hash_id': hash_id,
-        'status': 200  # Success
-    }
-    return total_data
+            raise NoResults(date)
+        price = item['price']
+        dep_time = item['dep_time']
+        arr_time = item['arr_time']
+
+        price_text = price.strip()
+        dep_time_text = dep_time.strip().replace(' Hrs', '')
+        arr_time_text = arr_time.strip().replace(' Hrs', '')
+
+        list_dict.append({
+            'date': date,
+            'departure_time': dep_time_text.strip(),
+            'arrival_time': arr_time_text.strip(),
+            'price': price_text.strip(),
+        })
+
+    for rows in chunks(list_dict):
+        yield rows
+
+
+async def get_info(
+        page: Page,
+        country_id: int,
+        origin: str,
+        origin_id: int,
+        destination: str,
+        destination_id: int,
+        total_size: int,
+        hash_id: str,
+        order: int,
+        date: str,
+        logger: Logger) -> Dict:
+    """
+    The Scraper which built on Pyppeteer. Finds info considering the given params.
+    :param page: Page object used to navigate in Tab of Browser.
+    :param origin: Starting point for scraping.
+    :param destination: Endpoint for scraping.
+    :param date: The date to scrape the info for.
+    :param logger: Page level logger.
+    :param country_id: ID of country being scraped. (Will be used to fetch the country form DB).
+    :param origin_id: ID of origin city. Will be used to fetch the city object.
+    :param destination_id: ID of destination city.
+    :param order: Order of the split (partial) data. (Used in ordering the total data before producing).
+    :param hash_id: Hash ID to determine to which data (the original whole data) this split belongs to.
+    :param total_size: How many splits we need to collect before being sure that whole data is actually processed.
+    :return: Dict
+    """
+    return await collect(stream_info(page, country_id, origin, origin_id, destination, destination_id, total_size,
+                                     hash_id, order, date, logger),
+                         country_id, origin_id, destination_id, total_size, hash_id, order)
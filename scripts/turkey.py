@@ -3,7 +3,45 @@ from pyppeteer.page import PageError, Page
 from configurations.settings import DARK_PURPLE, ENDE, INBOX, LIGHT_BLUE
 from pyppeteer.errors import TimeoutError
 from logging import Logger
-from typing import Dict
+from typing import AsyncIterator, Dict, List, Optional
+from scripts.utils import batching
+from scripts.utils.batching import DateStep
+from scripts.utils.extraction import extract_columns
+from scripts.utils.interception import intercept
+from scripts.utils.waiting import ERROR_TOAST, wait_first
+
+
+async def extract_results(page: Page, date: str, logger: Logger) -> Optional[List[Dict]]:
+    """
+    Waits for the metroturizm journey list and reads it.
+    :return: Data rows, None when the search has no results.
+    """
+    result = await wait_first(page, dict({
+        'journeys': '//div[contains(@class,"journey-item")]',
+        'no_journeys': ('h1, h2, h3, h4, p, .alert', 'sefer bulunamad'),
+        'no_journeys_en': ('h1, h2, h3, h4, p, .alert', 'no journey'),
+    }, **ERROR_TOAST), timeout=90000)
+    if result != 'journeys':
+        logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS ({result})"{ENDE}')
+        return None
+    list_dict = []
+    columns = await extract_columns(page, {
+        'times': '//div/span[contains(@class,"journey-item-hour ng-binding")]',
+        'prices': '//div/span[contains(@class,"price ng-binding")]',
+    })
+    times = [x.replace('\n', '').strip('                  ') for x in columns['times']]
+    departure_times = times[::2]
+    arrival_times = times[1::2]
+    string = "TL"
+    prices = ["{}{}".format(i,string) for i in columns['prices']]
+    for d, a, p in zip(departure_times,arrival_times, prices):
+        list_dict.append({
+            'date': date,
+            'departure_time': d,
+            'arrival_time': a,
+            'price': p
+        })
+    return list_dict
 
 
 async def get_info(page,country_id,origin,origin_id, destination,destination_id,total_size,hash_id,order,date,logger:Logger) -> Dict:
@@ -24,11 +62,9 @@ async def get_info(page,country_id,origin,origin_id, destination,destination_id,
     :return: Dict
     """
 
-    times = []
-    prices = []
     date_ = datetime.fromisoformat(date)
     date_ = date_.strftime('%d.%m.%Y')
-    list_dict = []
+    await intercept(page, 'metroturizm.com.tr')
     try:
         await page.goto('https://www.metroturizm.com.tr/en/', timeout=99000)
     except (TimeoutError, PageError):
@@ -44,6 +80,7 @@ async def get_info(page,country_id,origin,origin_id, destination,destination_id,
         await page.keyboard.press('Enter')
     except TimeoutError:
         logger.error(f'{DARK_PURPLE}Could not write {ENDE}{INBOX}{LIGHT_BLUE}"XPATH=//div/button[contains(text() ..."{ENDE}')
+        batching.route_invalid(page)
         return {
             'country_id': country_id,
             'origin_id': origin_id,
@@ -64,6 +101,7 @@ async def get_info(page,country_id,origin,origin_id, destination,destination_id,
         await page.keyboard.press('Enter')
     except TimeoutError:
         logger.error(f'{DARK_PURPLE}Could not locate {ENDE}{INBOX}{LIGHT_BLUE}"XPATH=//div/button[contains(text() ..."{ENDE}')
+        batching.route_invalid(page)
         return {
             'country_id': country_id,
             'origin_id': origin_id,
@@ -86,10 +124,8 @@ async def get_info(page,country_id,origin,origin_id, destination,destination_id,
     await page.type('#inpSearchJourneyBusBoardingDate', date_)
     await page.keyboard.press('Enter')
     await page.evaluate('''(selector) => document.querySelector(selector).click()''',"#btnIndexSearchJourneys")
-    try:
-        await page.waitForXPath('//div[contains(@class,"journey-item")]',{'visible': True, 'timeout': 90000})
-    except TimeoutError:
-        logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS"{ENDE}')
+    list_dict = await extract_results(page, date, logger)
+    if list_dict is None:
         return {
             'country_id': country_id,
             'origin_id': origin_id,
@@ -101,27 +137,7 @@ async def get_info(page,country_id,origin,origin_id, destination,destination_id,
             'hash_id': hash_id,
             'status': 400  # No data found
         }
-    time_info = await page.xpath('//div/span[contains(@class,"journey-item-hour ng-binding")]')
-    price = await page.xpath('//div/span[contains(@class,"price ng-binding")]')
-    for t in time_info:
-        time_txt = await page.evaluate('(element) => element.textContent', t)
-        times.append(time_txt)
-        times = [x.replace('\n', '') for x in times]
-        times = [x.strip('                  ') for x in times]
-    departure_times = times[::2]
-    arrival_times = times[1::2]
-    string = "TL"
-    for p in price:
-        price_txt = await page.evaluate('(element) => element.textContent', p)
-        prices.append(price_txt)
-    prices = ["{}{}".format(i,string) for i in prices]
-    for d, a, p in zip(departure_times,arrival_times, prices):
-        list_dict.append({
-            'date': date,
-            'departure_time': d,
-            'arrival_time': a,
-            'price': p
-        })
+
     total_data = {
         'country_id': country_id,
         'origin_id': origin_id,
@@ -133,3 +149,16 @@ async def get_info(page,country_id,origin,origin_id, destination,destination_id,
         'status': 200  # Success
     }
     return total_data
+
+
+DATE_STEP = DateStep('#inpSearchJourneyBusBoardingDate', '%d.%m.%Y', '#btnIndexSearchJourneys',
+                     '//div[contains(@class,"journey-item")]', extract_results)
+
+
+def get_info_dates(page, country_id, origin, origin_id, destination, destination_id, total_size, hash_id, order,
+                   dates: List[str], logger: Logger) -> AsyncIterator[Dict]:
+    """
+    Same as get_info for several dates of one route, streaming one result dict per date.
+    """
+    return batching.get_info_dates(get_info, DATE_STEP, page, country_id, origin, origin_id, destination,
+                                   destination_id, total_size, hash_id, order, dates, logger)
@@ -3,8 +3,44 @@ from pyppeteer.page import PageError, Page
 from pyppeteer.errors import TimeoutError
 from logging import Logger
 from configurations.settings import DARK_PURPLE, ENDE, INBOX, LIGHT_BLUE
-from typing import Dict
-from google_trans_new import google_translator
+from typing import AsyncIterator, Dict, List, Optional
+from scripts.utils import batching
+from scripts.utils.batching import DateStep
+from scripts.utils.aliases import localize
+from scripts.utils.extraction import extract_rows
+from scripts.utils.interception import intercept
+from scripts.utils.session_state import Consent, session_state
+
+CONSENT = Consent('button.close', 'button.close', timeout=5000)
+
+
+async def extract_results(page: Page, date: str, logger: Logger) -> Optional[List[Dict]]:
+    """
+    Waits for the copsa booking list and reads it.
+    :return: Data rows, None when the search has no results.
+    """
+    try:
+        await page.waitForXPath('//div[@class="booking-item"]', {'visible': True, 'timeout': 50000})
+    except TimeoutError:
+        logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS"{ENDE}')
+        return None
+
+    all_items = await extract_rows(page, '//div[@class="booking-item"]', {
+        'price': '.results_buy_button a',
+        'dep_time': 'div.booking-item div.booking-item-departure > h5:nth-child(2)',
+        'arr_time': 'div.booking-item div.booking-item-arrival > h5:nth-child(2)',
+    })
+
+    list_dict = []
+
+    for item in all_items:
+        list_dict.append({
+            'date': date,
+            'departure_time': item['dep_time'].strip(),
+            'arrival_time': item['arr_time'].strip(),
+            'price': item['price'].strip(),
+        })
+    return list_dict
 
 
 async def get_info(
@@ -39,22 +75,18 @@ async def get_info(
     '''
         Correcting input data
     '''
-    translator = google_translator()
-    origin = translator.translate(origin, lang_tgt='en').strip()
-    destination = translator.translate(
-        destination, lang_tgt='en').strip()
+    origin = await localize('copsa.com.uy', origin_id, origin)
+    destination = await localize('copsa.com.uy', destination_id, destination)
     date_ = datetime.fromisoformat(date)
     date_ = date_.strftime("%d/%m/%Y")
+    await intercept(page, 'copsa.com.uy')
+    restored = await session_state.restore(page, 'copsa.com.uy', CONSENT)
     try:
         await page.goto('https://www.copsa.com.uy/es/', timeout=90000)
     except (TimeoutError, PageError):
         logger.error(f'{DARK_PURPLE}Page either crushed or time exceeded{ENDE}')
 
-    try:
-        cookies = await page.waitForSelector('button.close', {'visible': True, 'timeout': 5000})
-        await cookies.click()
-    except TimeoutError:
-        logger.error(f'{DARK_PURPLE}Cookies button not found{ENDE}')
+    await session_state.consent(page, 'copsa.com.uy', CONSENT, restored, logger)
     """
         choose the date of departure
     """
@@ -83,6 +115,7 @@ async def get_info(
         await hint_city.click()
     except TimeoutError:
         logger.error(f'{DARK_PURPLE}Departure City {ENDE}{INBOX}{LIGHT_BLUE}"Is Not Valid ..."{ENDE}')
+        batching.route_invalid(page)
         return {
             'country_id': country_id,
             'origin_id': origin_id,
@@ -111,6 +144,7 @@ async def get_info(
         await hint_city.click()
     except TimeoutError:
         logger.error(f'{DARK_PURPLE}Arrival City {ENDE}{INBOX}{LIGHT_BLUE}"Is Not Valid ..."{ENDE}')
+        batching.route_invalid(page)
         return {
             'country_id': country_id,
             'origin_id': origin_id,
@@ -124,10 +158,8 @@ async def get_info(
         }
 
     await page.evaluate('''(selector) => document.querySelector(selector).click()''', '.btn-primary ')
-    try:
-        await page.waitForXPath('//ul[@class="booking-list"]', {'visible': True, 'timeout': 50000})
-    except TimeoutError:
-        logger.error(f'{DARK_PURPLE} No {ENDE}{INBOX}{LIGHT_BLUE}"FINAL RESULTS"{ENDE}')
+    list_dict = await extract_results(page, date, logger)
+    if list_dict is None:
         return {
             'country_id': country_id,
             'origin_id': origin_id,
@@ -140,25 +172,6 @@ async def get_info(
             'status': 400  # No data found
         }
 
-    all_items = await page.xpath('//div[@class="booking-item"]')
-
-    list_dict = []
-
-    for item in all_items:
-        price = await item.querySelector('.results_buy_button a')
-        dep_time = await item.querySelector('div.booking-item div.booking-item-departure > h5:nth-child(2)')
-        arr_time = await item.querySelector('div.booking-item div.booking-item-arrival > h5:nth-child(2)')
-
-        price_text = await page.evaluate('(element) => element.textContent', price)
-        dep_time_text = await page.evaluate('(element) => element.textContent', dep_time)
-        arr_time_text = await page.evaluate('(element) => element.textContent', arr_time)
-
-        list_dict.append({
-            'date': date,
-            'departure_time': dep_time_text.strip(),
-            'arrival_time': arr_time_text.strip(),
-            'price': price_text.strip(),
-        })
     total_data = {
         'country_id': country_id,
         'origin_id': origin_id,
@@ -170,3 +183,15 @@ async def get_info(
         'status': 200  # Success
     }
     return total_data
+
+
+DATE_STEP = DateStep('#go_date', '%d/%m/%Y', '.btn-primary ', 'div.booking-item', extract_results)
+
+
+def get_info_dates(page: Page, country_id: int, origin: str, origin_id: int, destination: str, destination_id: int,
+                   total_size: int, hash_id: str, order: int, dates: List[str], logger: Logger) -> AsyncIterator[Dict]:
+    """
+    Same as get_info for several dates of one route, streaming one result dict per date.
+    """
+    return batching.get_info_dates(get_info, DATE_STEP, page, country_id, origin, origin_id, destination,
+                                   destination_id, total_size, hash_id, order, dates, logger)
@@ -0,0 +1,96 @@
+import time
+from collections import OrderedDict
+from logging import Logger, getLogger
+from typing import Callable, Dict, List, Optional
+
+from scripts.utils.columns import ResultColumns
+
+
+class _Group:
+    __slots__ = ('created', 'total_size', 'splits')
+
+    def __init__(self, created: float, total_size: int):
+        self.created = created
+        self.total_size = total_size
+        self.splits: Dict[int, Dict] = {}
+
+
+class SplitAggregator:
+    """
+    Reassembles the split (partial) results of get_info by `hash_id`.
+    Splits may arrive in any order; once `total_size` of them are present their `data` lists are merged
+    in `order` and the combined record is returned straight away.
+    Incomplete groups are evicted after `ttl` seconds, and the oldest group is evicted when more than
+    `max_groups` are open, so memory stays bounded however many jobs are in flight.
+    With `columnar`, splits are held as ResultColumns and the combined `data` is one ResultColumns
+    (call to_dicts() for the list of dicts).
+    """
+
+    def __init__(self, ttl: float = 600.0, max_groups: int = 10000,
+                 on_evict: Optional[Callable[[str, List[Dict]], None]] = None, logger: Optional[Logger] = None,
+                 columnar: bool = False):
+        self.ttl = ttl
+        self.max_groups = max_groups
+        self.columnar = columnar
+        self.on_evict = on_evict
+        self.logger = logger or getLogger(__name__)
+        self._groups: 'OrderedDict[str, _Group]' = OrderedDict()
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def add(self, result: Dict, now: Optional[float] = None) -> Optional[Dict]:
+        """
+        Accepts one split. Returns the combined record when this split completes its group, otherwise None.
+        """
+        now = time.monotonic() if now is None else now
+        self.evict_expired(now)
+
+        hash_id = result['hash_id']
+        group = self._groups.get(hash_id)
+        if group is None:
+            group = self._groups[hash_id] = _Group(now, result.get('total_size') or 1)
+            while len(self._groups) > self.max_groups:
+                self._evict(next(iter(self._groups)))
+        if self.columnar and not isinstance(result['data'], ResultColumns):
+            result = dict(result, data=ResultColumns(result['data']))
+        group.splits[result.get('order') or 0] = result
+
+        if len(group.splits) < group.total_size:
+            return None
+        del self._groups[hash_id]
+        return self.combine(hash_id, group, self.columnar)
+
+    @staticmethod
+    def combine(hash_id: str, group: _Group, columnar: bool = False) -> Dict:
+        splits = [group.splits[order] for order in sorted(group.splits)]
+        data = ResultColumns() if columnar else []
+        for split in splits:
+            data.extend(split['data'])
+        first = splits[0]
+        return {
+            'country_id': first['country_id'],
+            'origin_id': first['origin_id'],
+            'destination_id': first['destination_id'],
+
+            'data': data,
+            'total_size': group.total_size,
+            'hash_id': hash_id,
+            'status': 200 if any(split['status'] == 200 for split in splits) else 400
+        }
+
+    def evict_expired(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        while self._groups:
+            hash_id, group = next(iter(self._groups.items()))
+            if now - group.created < self.ttl:
+                break
+            self._evict(hash_id)
+
+    def _evict(self, hash_id: str):
+        group = self._groups.pop(hash_id)
+        self.evicted += 1
+        self.logger.error(f'Split group {hash_id} evicted with {len(group.splits)}/{group.total_size} splits')
+        if self.on_evict is not None:
+            self.on_evict(hash_id, [group.splits[order] for order in sorted(group.splits)])
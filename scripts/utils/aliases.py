@@ -0,0 +1,178 @@
+"""
+Offline city name alias index.
+Maps (site, city id) to the spelling the site expects, so scrapers look names up in O(1)
+instead of translating them on every call. Missing entries fall back to the translation cache.
+
+Build the index from a CSV of "city_id,english name" rows:
+    python -m scripts.utils.aliases cities.csv
+Site identifiers of cities (busbud geohashes, station codes ...) are imported from "city_id,identifier" rows
+and stored under "<site>:id":
+    python -m scripts.utils.aliases --ids busbud.com geohashes.csv
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from scripts.utils.translation import translate, translate_sync
+
+DEFAULT_INDEX_PATH = os.environ.get(
+    'ALIASES_INDEX', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'pickles', 'aliases.json'))
+
+'''
+    site -> (target language, source language) of the spelling the site expects.
+'''
+SITE_LANGUAGES: Dict[str, Tuple[str, str]] = {
+    'pv.lv': ('lv', 'auto'),
+    'railways.kz': ('ru', 'en'),
+    'bahn.de': ('de', 'en'),
+    'railway.am': ('ru', 'en'),
+    'copsa.com.uy': ('en', 'auto'),
+    'avtobeket.kg': ('ru', 'en'),
+}
+
+_CYRILLIC = dict(zip(
+    'абвгдеёжзийклмнопрстуфхцчшщъыьэюяіїєґў',
+    ['a', 'b', 'v', 'g', 'd', 'e', 'e', 'zh', 'z', 'i', 'i', 'k', 'l', 'm', 'n', 'o', 'p', 'r', 's', 't', 'u',
+     'f', 'kh', 'ts', 'ch', 'sh', 'shch', '', 'y', '', 'e', 'iu', 'ia', 'i', 'i', 'e', 'g', 'u']))
+_NOT_WORD = re.compile(r'[\W_]+')
+
+
+def normalize(text: str) -> str:
+    """
+    Folds a city name for comparison: casefold, transliterate Cyrillic, drop diacritics and punctuation.
+    "Рига", "Rīga" and "RIGA " all become "riga".
+    """
+    text = ''.join(_CYRILLIC.get(char, char) for char in text.casefold())
+    text = ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+    return _NOT_WORD.sub(' ', text).strip()
+
+
+def best_match(text: str, options: Iterable[str], cutoff: float = 0.8) -> Optional[int]:
+    """
+    Index of the option which matches the text best, None if nothing is similar enough.
+    A normalized option containing the normalized text wins straight away, like XPath contains() does.
+    """
+    wanted = normalize(text)
+    if not wanted:
+        return None
+    best_index, best_ratio = None, cutoff
+    for index, option in enumerate(options):
+        candidate = normalize(option)
+        if candidate == wanted or wanted in candidate.split(' ') or candidate.startswith(wanted):
+            return index
+        ratio = SequenceMatcher(None, wanted, candidate).ratio()
+        if ratio > best_ratio:
+            best_index, best_ratio = index, ratio
+    return best_index
+
+
+async def pick_option(page, xpath: str, text: str, cutoff: float = 0.8):
+    """
+    Finds the autocomplete option matching the text among the elements of the XPath.
+    All option texts are read in one page.evaluate call.
+    :return: ElementHandle of the best option or None.
+    """
+    options = await page.xpath(xpath)
+    if not options:
+        return None
+    texts = await page.evaluate('(...nodes) => nodes.map((node) => node.textContent)', *options)
+    index = best_match(text, texts, cutoff)
+    return options[index] if index is not None else None
+
+
+class AliasIndex:
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        self._index: Optional[Dict[str, Dict[str, str]]] = None
+
+    @property
+    def index(self) -> Dict[str, Dict[str, str]]:
+        if self._index is None:
+            try:
+                with open(self.path, encoding='utf-8') as index_file:
+                    self._index = json.load(index_file)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def lookup(self, site: str, city_id) -> Optional[str]:
+        return self.index.get(site, {}).get(str(city_id))
+
+    def build(self, cities: List[Tuple[str, str]], sites: Iterable[str] = tuple(SITE_LANGUAGES)):
+        """
+        Fills the index for every (city_id, english name) pair using the translation cache and saves it.
+        """
+        for site in sites:
+            lang_tgt, lang_src = SITE_LANGUAGES[site]
+            spellings = self.index.setdefault(site, {})
+            for city_id, name in cities:
+                spellings[str(city_id)] = translate_sync(name, lang_tgt=lang_tgt, lang_src=lang_src).strip()
+        self.save()
+
+    def import_ids(self, site: str, rows: Iterable[Tuple[str, str]]):
+        """
+        Stores the site's identifiers of cities, (city_id, identifier) pairs, under "<site>:id" and saves.
+        """
+        identifiers = self.index.setdefault(f'{site}:id', {})
+        for city_id, identifier in rows:
+            identifiers[str(city_id)] = identifier.strip()
+        self.save()
+
+    def remember(self, site: str, city_id, value: str):
+        """
+        Stores a value learned while scraping (e.g. a station id seen in a result URL).
+        """
+        if city_id is None or self.lookup(site, city_id) == value:
+            return
+        self.index.setdefault(site, {})[str(city_id)] = value
+        self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as index_file:
+            json.dump(self.index, index_file, ensure_ascii=False, separators=(',', ':'))
+
+
+aliases = AliasIndex()
+
+
+async def localize(site: str, city_id, name: str) -> str:
+    """
+    Spelling of the city expected by the site: from the alias index, or translated when it is not indexed.
+    """
+    alias = aliases.lookup(site, city_id)
+    if alias is not None:
+        return alias
+    lang_tgt, lang_src = SITE_LANGUAGES[site]
+    return (await translate(name, lang_tgt=lang_tgt, lang_src=lang_src)).strip()
+
+
+def localize_sync(site: str, city_id, name: str) -> str:
+    alias = aliases.lookup(site, city_id)
+    if alias is not None:
+        return alias
+    lang_tgt, lang_src = SITE_LANGUAGES[site]
+    return translate_sync(name, lang_tgt=lang_tgt, lang_src=lang_src).strip()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the city name alias index.')
+    parser.add_argument('cities', help='CSV file with "city_id,english name" rows, or "city_id,identifier" '
+                                       'rows with --ids.')
+    parser.add_argument('--sites', nargs='+', default=list(SITE_LANGUAGES))
+    parser.add_argument('--ids', metavar='SITE', help='Import the CSV as the identifiers of the cities on SITE.')
+    args = parser.parse_args()
+    with open(args.cities, encoding='utf-8', newline='') as cities_file:
+        rows = [(row[0], row[1]) for row in csv.reader(cities_file) if len(row) >= 2]
+    if args.ids:
+        aliases.import_ids(args.ids, rows)
+        print(f'{len(rows)} {args.ids} identifiers imported into {aliases.path}')
+    else:
+        aliases.build(rows, args.sites)
+        print(f'{len(rows)} cities indexed for {len(args.sites)} sites into {aliases.path}')
@@ -0,0 +1,81 @@
+"""
+HTTP fast path for sites which fill their result lists from JSON endpoints.
+A single pooled aiohttp session is shared by all scrapers. Any transport error, unexpected status
+or schema mismatch raises ApiUnavailable, and the scraper falls back to its pyppeteer flow.
+"""
+import asyncio
+from typing import Any, Dict, Optional, Tuple, Union
+
+from scripts.utils.aliases import aliases
+
+try:
+    import aiohttp
+except ImportError:  # API mode is simply unavailable without aiohttp
+    aiohttp = None
+
+_session: Optional['aiohttp.ClientSession'] = None
+
+
+class ApiUnavailable(Exception):
+    """
+    The API could not answer the query; the caller should use the browser flow instead.
+    """
+
+
+async def get_session() -> 'aiohttp.ClientSession':
+    global _session
+    if aiohttp is None:
+        raise ApiUnavailable('aiohttp is not installed')
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=64, limit_per_host=8, keepalive_timeout=60),
+            headers={'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) '
+                                   'Chrome/88.0.4324.182 Safari/537.36'})
+    return _session
+
+
+async def close_session():
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
+
+
+async def fetch_json(url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+                     json: Any = None, method: str = 'GET', timeout: float = 10.0) -> Any:
+    session = await get_session()
+    try:
+        async with session.request(method, url, params=params, headers=headers, json=json,
+                                   timeout=aiohttp.ClientTimeout(total=timeout)) as res:
+            if res.status != 200:
+                raise ApiUnavailable(f'{url} answered {res.status}')
+            return await res.json(content_type=None)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as error:
+        raise ApiUnavailable(f'{url} failed: {error!r}') from error
+
+
+def field(payload: Any, *path, kind: Union[type, Tuple[type, ...], None] = None):
+    """
+    Walks keys / indexes of a JSON payload, raising ApiUnavailable when the schema does not match.
+        field(departure, 'prices', 'total', kind=(int, float))
+    :param kind: Type(s) the value must have (null included), checked when given.
+    """
+    value = payload
+    for key in path:
+        try:
+            value = value[key]
+        except (KeyError, IndexError, TypeError):
+            raise ApiUnavailable(f'Unexpected API schema, missing {path}')
+    if kind is not None and not isinstance(value, kind):
+        raise ApiUnavailable(f'Unexpected API schema, {path} is {type(value).__name__}')
+    return value
+
+
+def station_id(site: str, city_id) -> str:
+    """
+    Identifier of the city on the site (geohash, station code ...), stored in the alias index under "<site>:id".
+    """
+    identifier = aliases.lookup(f'{site}:id', city_id)
+    if identifier is None:
+        raise ApiUnavailable(f'No {site} id for city {city_id}')
+    return identifier
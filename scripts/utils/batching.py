@@ -0,0 +1,123 @@
+"""
+Multi-date batching for a single route.
+The first date runs the scraper's full get_info flow (home page, cookies, origin, destination, search).
+Every further date reuses that session: only the date input is rewritten and the search re-submitted,
+so a 30 day horizon costs about one session instead of 30.
+"""
+from datetime import datetime
+from logging import Logger
+from pyppeteer.errors import ElementHandleError, PageError
+from pyppeteer.page import Page
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from scripts.utils.datepicker import set_date
+from scripts.utils.extraction import QUERY_JS
+
+CLEAR_RESULTS_JS = '''(selector) => {
+    %s
+    query(document, selector).forEach((node) => node.remove());
+}''' % QUERY_JS
+
+
+class DateStep:
+    """
+    How to re-run the search of an already filled form for another date.
+    :param input: CSS selector of the date input.
+    :param date_format: strftime format the input expects, None to type the date as given.
+    :param submit: CSS selector clicked to search again, None to press Enter in the input.
+    :param results: Selector (CSS or XPath) of the result items (rows, cards), which `extract` waits for. They are
+                    removed before searching, so the wait only matches the items of the new search. Their container
+                    stays: it is already in the page and would match at once.
+    :param extract: Waits for and reads the results of one date; None when the date has no results.
+    """
+
+    def __init__(self, input: str, date_format: Optional[str], submit: Optional[str], results: str,
+                 extract: Callable[[Page, str, Logger], Awaitable[Optional[List[Dict]]]]):
+        self.input = input
+        self.date_format = date_format
+        self.submit = submit
+        self.results = results
+        self.extract = extract
+
+    def format(self, date: str) -> str:
+        return datetime.fromisoformat(date).strftime(self.date_format) if self.date_format else date
+
+
+class _InputMissing(Exception):
+    pass
+
+
+def route_invalid(page: Page):
+    """
+    Called by a scraper's get_info when the site does not offer the origin or the destination: the search form
+    was never submitted, and no other date of the route can have results either.
+    """
+    page._scraper_route_invalid = True
+
+
+async def search_date(page: Page, step: DateStep, date: str, logger: Logger) -> Optional[List[Dict]]:
+    await page.evaluate(CLEAR_RESULTS_JS, step.results)
+    try:
+        if not await set_date(page, step.input, step.format(date)):
+            raise _InputMissing(step.input)
+    except (PageError, ElementHandleError):
+        raise _InputMissing(step.input)
+    if step.submit:
+        await page.evaluate('''(selector) => document.querySelector(selector).click()''', step.submit)
+    else:
+        await page.focus(step.input)
+        await page.keyboard.press('Enter')
+    return await step.extract(page, date, logger)
+
+
+async def get_info_dates(
+        get_info: Callable[..., Awaitable[Dict]],
+        step: DateStep,
+        page: Page,
+        country_id: int,
+        origin: str,
+        origin_id: int,
+        destination: str,
+        destination_id: int,
+        total_size: int,
+        hash_id: str,
+        order: int,
+        dates: List[str],
+        logger: Logger) -> AsyncIterator[Dict]:
+    """
+    Streams one result dict per date, in the order of `dates`.
+    Split envelopes are numbered from `order` on: the result of dates[i] carries order + i.
+    When the date input cannot be found (the site left the search form), that date falls back to get_info.
+    When the first date shows the route is invalid (see route_invalid) or crashed the scraper (status 500), every
+    other date gets its status without being searched. Any other failure of the first date, e.g. a day without
+    departures, is that date's own: the other dates are still searched.
+    """
+    for index, date in enumerate(dates):
+        if index == 0:
+            page._scraper_route_invalid = False
+            result = await get_info(page, country_id, origin, origin_id, destination, destination_id,
+                                    total_size, hash_id, order, date, logger)
+            yield result
+            if result['status'] == 500 or page._scraper_route_invalid:
+                for rest in range(1, len(dates)):
+                    yield dict(result, data=[], order=order + rest)
+                return
+            continue
+        try:
+            list_dict = await search_date(page, step, date, logger)
+        except _InputMissing:
+            logger.error(f'Date input {step.input} not found, running the full flow for {date}')
+            yield await get_info(page, country_id, origin, origin_id, destination, destination_id,
+                                 total_size, hash_id, order + index, date, logger)
+            continue
+        yield {
+            'country_id': country_id,
+            'origin_id': origin_id,
+            'destination_id': destination_id,
+
+            'data': list_dict or [],
+            'total_size': total_size,
+            'order': order + index,
+            'hash_id': hash_id,
+            'status': 200 if list_dict is not None else 400
+        }
@@ -0,0 +1,168 @@
+"""
+Result cache in front of the scrapers.
+Results are stored in SQLite keyed by (site, country, origin, destination, date). How long a result
+stays fresh depends on the site and on how far away the departure is: prices of tomorrow's departures
+move faster than those of next month. A result past its TTL is still served for a grace period while
+it is refreshed in the background (stale-while-revalidate). "No data" answers (status 400) are cached
+too, for a shorter time. Crashes (status 500) are never cached.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date as Date, datetime
+from logging import Logger, getLogger
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from configurations.settings import DARK_PURPLE, ENDE
+
+DEFAULT_DB_PATH = os.environ.get(
+    'RESULTS_DB', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               'pickles', 'results.sqlite3'))
+
+'''
+    TTL tiers: (departure at most this many days away, seconds fresh). None matches any distance.
+'''
+DEFAULT_TTLS: List[Tuple[Optional[int], int]] = [
+    (1, 15 * 60),
+    (7, 60 * 60),
+    (30, 6 * 60 * 60),
+    (None, 24 * 60 * 60),
+]
+SITE_TTLS: Dict[str, List[Tuple[Optional[int], int]]] = {
+    'ask-aladdin.com': [(None, 7 * 24 * 60 * 60)],  # Static timetables
+    'avtobeket.kg': [(None, 24 * 60 * 60)],
+}
+NEGATIVE_TTL = 30 * 60
+STALE_FACTOR = 1.0  # A stale entry is served for STALE_FACTOR * its TTL after expiring
+
+Key = Tuple[str, int, int, int, str]
+
+
+def ttl_for(site: str, date: str, today: Optional[Date] = None) -> int:
+    days = max(0, (datetime.fromisoformat(date).date() - (today or Date.today())).days)
+    for max_days, ttl in SITE_TTLS.get(site, DEFAULT_TTLS):
+        if max_days is None or days <= max_days:
+            return ttl
+    return DEFAULT_TTLS[-1][1]
+
+
+class ResultCache:
+    def __init__(self, path: str = DEFAULT_DB_PATH, negative_ttl: int = NEGATIVE_TTL,
+                 stale_factor: float = STALE_FACTOR, logger: Optional[Logger] = None):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self.stale_factor = stale_factor
+        self.logger = logger or getLogger(__name__)
+        self.stats: Dict[str, Counter] = defaultdict(Counter)
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._refreshing: Set[Key] = set()
+        self._tasks: Set['asyncio.Task'] = set()
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute('CREATE TABLE IF NOT EXISTS results ('
+                             'site TEXT, country_id INTEGER, origin_id INTEGER, destination_id INTEGER, date TEXT, '
+                             'status INTEGER, data TEXT, expires_at REAL, stale_until REAL, '
+                             'PRIMARY KEY (site, country_id, origin_id, destination_id, date))')
+            self._db.commit()
+        return self._db
+
+    def get(self, key: Key, now: Optional[float] = None) -> Optional[Tuple[List[Dict], int, bool]]:
+        """
+        :return: (data, status, fresh) of the stored result, None when nothing usable is stored.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self.db.execute('SELECT data, status, expires_at, stale_until FROM results WHERE site=? AND '
+                                  'country_id=? AND origin_id=? AND destination_id=? AND date=?', key).fetchone()
+        if row is None or row[3] < now:
+            return None
+        return json.loads(row[0]), row[1], row[2] >= now
+
+    def put(self, key: Key, result: Dict, now: Optional[float] = None):
+        status = result.get('status')
+        if status not in (200, 400):
+            return
+        now = time.time() if now is None else now
+        ttl = ttl_for(key[0], key[4]) if status == 200 else self.negative_ttl
+        with self._lock:
+            self.db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                            key + (status, json.dumps(result.get('data') or [], ensure_ascii=False),
+                                   now + ttl, now + ttl * (1 + self.stale_factor)))
+            self.db.commit()
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """
+        Deletes the entries which can no longer be served, even stale.
+        """
+        with self._lock:
+            deleted = self.db.execute('DELETE FROM results WHERE stale_until < ?',
+                                      (time.time() if now is None else now,)).rowcount
+            self.db.commit()
+        return deleted
+
+    def answer(self, key: Key) -> Optional[Tuple[List[Dict], int, bool]]:
+        """
+        The servable cached result, counted in the stats.
+        :return: (data, status, refresh), None on a miss. refresh is True when the entry is stale and nobody
+                 refreshes it yet: the caller then owes one refresh, ending with store() and release().
+        """
+        site = key[0]
+        cached = self.get(key)
+        if cached is None:
+            self.stats[site]['miss'] += 1
+            return None
+        data, status, fresh = cached
+        self.stats[site]['negative_hit' if status == 400 else 'hit' if fresh else 'stale_hit'] += 1
+        refresh = not fresh and key not in self._refreshing
+        if refresh:
+            self._refreshing.add(key)
+        return data, status, refresh
+
+    def store(self, key: Key, result: Dict):
+        if key in self._refreshing and result.get('status') in (200, 400):
+            self.stats[key[0]]['refreshed'] += 1
+        self.put(key, result)
+
+    def release(self, key: Key):
+        self._refreshing.discard(key)
+
+    async def _revalidate(self, key: Key, scrape: Callable[[], Awaitable[Dict]]):
+        try:
+            self.store(key, await scrape())
+        except Exception as error:
+            self.logger.error(f'{DARK_PURPLE}Refreshing {key} failed: {error}{ENDE}')
+        finally:
+            self.release(key)
+
+    async def fetch(self, key: Key, scrape: Callable[[], Awaitable[Dict]]) -> Tuple[List[Dict], int]:
+        """
+        Answers from the cache when possible, otherwise awaits the scrape and stores its result.
+        A stale entry is answered at once and `scrape` runs in a background task. The Scheduler does not
+        use this: it queues the refresh as a job of the site, under the site's limits.
+        :param key: (site, country_id, origin_id, destination_id, date).
+        :param scrape: Runs the scraper and returns its result dict.
+        :return: (data, status)
+        """
+        answered = self.answer(key)
+        if answered is not None:
+            data, status, refresh = answered
+            if refresh:
+                task = asyncio.ensure_future(self._revalidate(key, scrape))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return data, status
+        result = await scrape()
+        self.put(key, result)
+        return result.get('data') or [], result.get('status')
+
+    def report(self) -> Dict[str, Dict[str, int]]:
+        return {site: dict(counts) for site, counts in self.stats.items()}
@@ -0,0 +1,76 @@
+"""
+Single-flight coalescing of identical scrapes.
+When several jobs ask for the same (site, origin, destination, date) while a scrape of it is running,
+they all await that one scrape instead of driving their own tabs through the same site.
+Every caller gets its own envelope (hash_id, order, total_size) around the shared data.
+"""
+import asyncio
+from collections import Counter, defaultdict
+from logging import Logger
+from pyppeteer.page import Page
+from typing import Awaitable, Callable, Dict, Hashable, List, Tuple
+
+Flight = Tuple[List[Dict], int]
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[Hashable, 'asyncio.Future'] = {}
+        self.stats: Dict[str, Counter] = defaultdict(Counter)
+
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Tuple, run: Callable[[], Awaitable[Flight]]) -> Flight:
+        """
+        Runs `run` unless a call with the same key is in flight, in which case its result is awaited.
+        The shared call is shielded: a cancelled caller does not cancel it for the others.
+        :param key: Tuple starting with the site, e.g. (site, origin_id, destination_id, date).
+        :param run: Returns (data, status).
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats[key[0]]['leader'] += 1
+            task = asyncio.ensure_future(run())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.stats[key[0]]['coalesced'] += 1
+        data, status = await asyncio.shield(task)
+        # Every caller gets its own rows: later stages (normalization) rewrite them in place
+        return [dict(row) for row in data], status
+
+    def wrap(self, site: str, get_info: Callable[..., Awaitable[Dict]]) -> Callable[..., Awaitable[Dict]]:
+        """
+        get_info with the same signature whose concurrent identical calls share one scrape,
+        run in the page of the first caller.
+        """
+
+        async def coalesced(page: Page, country_id: int, origin: str, origin_id: int, destination: str,
+                            destination_id: int, total_size: int, hash_id: str, order: int, date: str,
+                            logger: Logger) -> Dict:
+            async def run() -> Flight:
+                result = await get_info(page, country_id, origin, origin_id, destination, destination_id,
+                                        total_size, hash_id, order, date, logger)
+                return result['data'], result['status']
+
+            data, status = await self.do((site, origin_id, destination_id, date), run)
+            return {
+                'country_id': country_id,
+                'origin_id': origin_id,
+                'destination_id': destination_id,
+
+                'data': data,
+                'total_size': total_size,
+                'order': order,
+                'hash_id': hash_id,
+                'status': status
+            }
+
+        return coalesced
+
+    def report(self) -> Dict[str, Dict[str, int]]:
+        return {site: dict(counts) for site, counts in self.stats.items()}
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,186 @@
+"""
+Columnar container for scraped rows.
+Instead of one four key dict per departure, rows are kept as four columns. The date, identical for
+whole runs of rows, is dictionary encoded into an array of small codes. Slices are views over the same
+storage (no copy), dicts are only built when to_dicts() / iteration asks for them, and the columns
+serialize directly to Arrow or MessagePack for the producer.
+"""
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+try:
+    import msgpack
+except ImportError:  # to_msgpack is unavailable without msgpack
+    msgpack = None
+
+try:
+    import pyarrow
+except ImportError:  # to_arrow is unavailable without pyarrow
+    pyarrow = None
+
+FIELDS = ('date', 'departure_time', 'arrival_time', 'price')
+
+
+class _Storage:
+    __slots__ = ('dates', 'date_codes', 'date_index', 'departure_time', 'arrival_time', 'price')
+
+    def __init__(self):
+        self.dates: List[str] = []
+        self.date_index: Dict[str, int] = {}
+        self.date_codes = array('H')
+        self.departure_time: list = []
+        self.arrival_time: list = []
+        self.price: list = []
+
+    def code(self, date: str) -> int:
+        code = self.date_index.get(date)
+        if code is None:
+            code = self.date_index[date] = len(self.dates)
+            self.dates.append(date)
+        return code
+
+
+class ResultColumns:
+    __slots__ = ('_storage', '_start', '_stop', '_owner')
+
+    def __init__(self, rows: Optional[Iterable[Dict]] = None):
+        self._storage = _Storage()
+        self._start = 0
+        self._stop = 0
+        self._owner = True
+        if rows is not None:
+            self.extend(rows)
+
+    @classmethod
+    def _view(cls, storage: _Storage, start: int, stop: int) -> 'ResultColumns':
+        view = cls.__new__(cls)
+        view._storage = storage
+        view._start = start
+        view._stop = stop
+        view._owner = False
+        return view
+
+    def _check_writable(self):
+        if not self._owner:
+            raise ValueError('ResultColumns slices are read-only views')
+
+    def append(self, date: str, departure_time, arrival_time, price):
+        self._check_writable()
+        storage = self._storage
+        storage.date_codes.append(storage.code(date))
+        storage.departure_time.append(departure_time)
+        storage.arrival_time.append(arrival_time)
+        storage.price.append(price)
+        self._stop += 1
+
+    def extend(self, rows: Union[Iterable[Dict], 'ResultColumns']):
+        """
+        Appends rows given as dicts (a scraper's list_dict) or as another ResultColumns.
+        """
+        if isinstance(rows, ResultColumns):
+            for date, departure_time, arrival_time, price in rows.tuples():
+                self.append(date, departure_time, arrival_time, price)
+            return
+        for row in rows:
+            self.append(row['date'], row['departure_time'], row['arrival_time'], row['price'])
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __bool__(self) -> bool:
+        return self._stop > self._start
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[Dict, 'ResultColumns']:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError('ResultColumns slices must be contiguous')
+            return self._view(self._storage, self._start + start, self._start + max(start, stop))
+        index = range(self._start, self._stop)[key]
+        storage = self._storage
+        return {
+            'date': storage.dates[storage.date_codes[index]],
+            'departure_time': storage.departure_time[index],
+            'arrival_time': storage.arrival_time[index],
+            'price': storage.price[index],
+        }
+
+    def tuples(self) -> Iterator[tuple]:
+        storage = self._storage
+        dates = storage.dates
+        for index in range(self._start, self._stop):
+            yield (dates[storage.date_codes[index]], storage.departure_time[index], storage.arrival_time[index],
+                   storage.price[index])
+
+    def __iter__(self) -> Iterator[Dict]:
+        for row in self.tuples():
+            yield dict(zip(FIELDS, row))
+
+    def to_dicts(self) -> List[Dict]:
+        """
+        The rows in the scrapers' list_dict shape.
+        """
+        return list(self)
+
+    def column(self, name: str) -> list:
+        storage = self._storage
+        if name == 'date':
+            return [storage.dates[code] for code in storage.date_codes[self._start:self._stop]]
+        return getattr(storage, name)[self._start:self._stop]
+
+    def to_columns(self) -> Dict:
+        """
+        Plain columns, with the dates dictionary encoded: {'dates': [...], 'date': [codes], ...}.
+        """
+        storage = self._storage
+        return {
+            'dates': storage.dates,
+            'date': storage.date_codes[self._start:self._stop].tolist(),
+            'departure_time': self.column('departure_time'),
+            'arrival_time': self.column('arrival_time'),
+            'price': self.column('price'),
+        }
+
+    @classmethod
+    def from_columns(cls, columns: Dict) -> 'ResultColumns':
+        result = cls()
+        dates = columns['dates']
+        for code, departure_time, arrival_time, price in zip(columns['date'], columns['departure_time'],
+                                                             columns['arrival_time'], columns['price']):
+            result.append(dates[code], departure_time, arrival_time, price)
+        return result
+
+    def to_msgpack(self) -> bytes:
+        if msgpack is None:
+            raise RuntimeError('msgpack is not installed')
+        return msgpack.packb(self.to_columns(), use_bin_type=True)
+
+    @classmethod
+    def from_msgpack(cls, packed: bytes) -> 'ResultColumns':
+        if msgpack is None:
+            raise RuntimeError('msgpack is not installed')
+        return cls.from_columns(msgpack.unpackb(packed, raw=False))
+
+    def to_arrow(self) -> 'pyarrow.Table':
+        """
+        Arrow table with the date as a dictionary column. Prices mixing numbers and texts become texts.
+        """
+        if pyarrow is None:
+            raise RuntimeError('pyarrow is not installed')
+        storage = self._storage
+        prices = self.column('price')
+        try:
+            price_array = pyarrow.array(prices)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+            price_array = pyarrow.array([None if price is None else str(price) for price in prices])
+        return pyarrow.table({
+            'date': pyarrow.DictionaryArray.from_arrays(
+                pyarrow.array(storage.date_codes[self._start:self._stop].tolist(), type=pyarrow.uint16()),
+                pyarrow.array(storage.dates, type=pyarrow.string())),
+            'departure_time': pyarrow.array(self.column('departure_time')),
+            'arrival_time': pyarrow.array(self.column('arrival_time')),
+            'price': price_array,
+        })
+
+    def __repr__(self) -> str:
+        return f'ResultColumns({len(self)} rows, {len(self._storage.dates)} dates)'
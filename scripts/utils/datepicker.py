@@ -0,0 +1,132 @@
+"""
+Date picker drivers.
+Inputs backed by a text field are set through one page.evaluate (set_date), which also updates jQuery UI
+and flatpickr widgets when the page uses them. Calendars which only accept clicks on day cells are driven
+by CalendarDriver: the month offset is computed up front and every "next month" click, with its re-render,
+happens inside one evaluate (waiting for each re-render to go quiet), under a hard bound on the clicks.
+"""
+from datetime import date as Date, datetime
+from logging import Logger
+from pyppeteer.page import Page
+from typing import Optional
+
+from configurations.settings import DARK_PURPLE, ENDE, INBOX, LIGHT_BLUE
+from scripts.utils.extraction import QUERY_JS
+from scripts.utils.waiting import wait_first
+
+SET_DATE_JS = '''(selector, value) => {
+    const input = document.querySelector(selector);
+    if (!input) {
+        return false;
+    }
+    input.removeAttribute('readonly');
+    if (input._flatpickr) {
+        input._flatpickr.setDate(value, true);
+        return true;
+    }
+    const $ = window.jQuery;
+    if ($ && $.datepicker && $(input).hasClass('hasDatepicker')) {
+        try {
+            const format = $(input).datepicker('option', 'dateFormat');
+            $(input).datepicker('setDate', $.datepicker.parseDate(format, value));
+        } catch (error) {
+            // The widget's dateFormat does not match the value: write the text as is
+            input.value = value;
+        }
+    } else {
+        input.value = value;
+    }
+    input.dispatchEvent(new Event('input', {bubbles: true}));
+    input.dispatchEvent(new Event('change', {bubbles: true}));
+    return true;
+}'''
+
+PICK_DAY_JS = '''async (day, next, bound, settle) => {
+    %s
+    const rendered = () => new Promise((resolve) => {
+        let quiet = null;
+        const done = () => {
+            observer.disconnect();
+            clearTimeout(quiet);
+            clearTimeout(limit);
+            resolve();
+        };
+        const observer = new MutationObserver(() => {
+            clearTimeout(quiet);
+            quiet = setTimeout(done, 50);
+        });
+        const limit = setTimeout(done, settle);
+        observer.observe(document.body, {childList: true, subtree: true, attributes: true});
+    });
+    for (let clicks = 0; clicks <= bound; clicks++) {
+        const cell = query(document, day)[0];
+        if (cell) {
+            cell.click();
+            return clicks;
+        }
+        const button = query(document, next)[0];
+        if (!button) {
+            return -1;
+        }
+        const settled = rendered();
+        button.click();
+        await settled;
+    }
+    return -1;
+}''' % QUERY_JS
+
+
+async def set_date(page: Page, selector: str, value: str) -> bool:
+    """
+    Writes the date into the input (or its widget) in one evaluate.
+    :return: False when the input does not exist.
+    """
+    return await page.evaluate(SET_DATE_JS, selector, value)
+
+
+class CalendarDriver:
+    """
+    :param day: Selector (CSS or XPath) of the day cell, formatted with {date}.
+    :param next_month: Selector of the "next month" button.
+    :param date_format: strftime format of {date} in the day selector.
+    :param months_shown: Months the calendar shows at once.
+    :param max_months: Hard bound on "next month" clicks.
+    :param settle: Milliseconds to wait for the calendar to re-render after one click.
+    """
+
+    def __init__(self, day: str, next_month: str, date_format: str, months_shown: int = 1, max_months: int = 13,
+                 settle: int = 1000):
+        self.day = day
+        self.next_month = next_month
+        self.date_format = date_format
+        self.months_shown = months_shown
+        self.max_months = max_months
+        self.settle = settle
+
+    def month_offset(self, date: str, today: Optional[Date] = None) -> int:
+        """
+        "Next month" clicks needed from the current month for the date to be shown.
+        """
+        target = datetime.fromisoformat(date)
+        today = today or Date.today()
+        return max(0, (target.year - today.year) * 12 + target.month - today.month - (self.months_shown - 1))
+
+    async def pick(self, page: Page, date: str, logger: Logger) -> bool:
+        """
+        Clicks the day of the date, moving the calendar forward as needed.
+        At most the computed month offset plus the months shown are clicked through, never more than max_months.
+        """
+        offset = self.month_offset(date)
+        if offset > self.max_months:
+            logger.error(f'{DARK_PURPLE}{date} is {offset} months away, beyond the calendar bound{ENDE}')
+            return False
+        day = self.day.format(date=datetime.fromisoformat(date).strftime(self.date_format))
+        bound = min(self.max_months, offset + self.months_shown)
+        if await wait_first(page, {'day': day, 'next': self.next_month}, self.settle * 5) is None:
+            logger.error(f'{DARK_PURPLE}Calendar did not open {ENDE}{INBOX}{LIGHT_BLUE}"{self.next_month}"{ENDE}')
+            return False
+        clicks = await page.evaluate(PICK_DAY_JS, day, self.next_month, bound, self.settle)
+        if clicks < 0:
+            logger.error(f'{DARK_PURPLE}{date} Could not locate {ENDE}{INBOX}{LIGHT_BLUE}"{day}"{ENDE}')
+            return False
+        return True
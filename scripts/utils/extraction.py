@@ -0,0 +1,81 @@
+from pyppeteer.page import Page
+from typing import Dict, List, Optional, Tuple, Union
+
+'''
+    Field spec: either a selector (first match is taken) or a (selector, index) pair.
+    Selectors starting with "/", "(" or "./" are treated as XPath, everything else as CSS.
+    Negative indexes count from the end, like Python lists.
+'''
+FieldSpec = Union[str, Tuple[str, int]]
+
+QUERY_JS = '''
+    const isXPath = (sel) => sel.startsWith('/') || sel.startsWith('(') || sel.startsWith('./');
+    const query = (ctx, sel) => {
+        if (!isXPath(sel)) {
+            return Array.from(ctx.querySelectorAll(sel));
+        }
+        const snapshot = document.evaluate(sel, ctx, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        const nodes = [];
+        for (let i = 0; i < snapshot.snapshotLength; i++) {
+            nodes.push(snapshot.snapshotItem(i));
+        }
+        return nodes;
+    };
+    const pick = (nodes, index) => {
+        const node = nodes[index < 0 ? nodes.length + index : index];
+        return node ? node.textContent : null;
+    };
+'''
+
+ROWS_JS = '''(rowSelector, fields) => {
+    %s
+    return query(document, rowSelector).map((row) => {
+        const item = {};
+        for (const [name, selector, index] of fields) {
+            item[name] = pick(query(row, selector), index);
+        }
+        return item;
+    });
+}''' % QUERY_JS
+
+COLUMNS_JS = '''(columns) => {
+    %s
+    const result = {};
+    for (const [name, selector] of columns) {
+        result[name] = query(document, selector).map((node) => node.textContent);
+    }
+    return result;
+}''' % QUERY_JS
+
+
+def _normalize_fields(fields: Dict[str, FieldSpec]) -> List[list]:
+    normalized = []
+    for name, spec in fields.items():
+        if isinstance(spec, str):
+            normalized.append([name, spec, 0])
+        else:
+            selector, index = spec
+            normalized.append([name, selector, index])
+    return normalized
+
+
+async def extract_rows(page: Page, rows: str, fields: Dict[str, FieldSpec]) -> List[Dict[str, Optional[str]]]:
+    """
+    Extracts a table-like structure from the page in a single page.evaluate call.
+    :param page: Page object used to navigate in Tab of Browser.
+    :param rows: Selector of the row elements (CSS or XPath).
+    :param fields: Mapping of output key to a field selector, relative to the row.
+    :return: List of dicts with the raw textContent of every field (None when the field is missing).
+    """
+    return await page.evaluate(ROWS_JS, rows, _normalize_fields(fields))
+
+
+async def extract_columns(page: Page, columns: Dict[str, str]) -> Dict[str, List[str]]:
+    """
+    Collects the textContent of several independent node lists in a single page.evaluate call.
+    Used by the scrapers which zip parallel lists (times, prices) instead of walking rows.
+    :param page: Page object used to navigate in Tab of Browser.
+    :param columns: Mapping of output key to a document level selector (CSS or XPath).
+    :return: Dict of output key to the list of raw textContent values.
+    """
+    return await page.evaluate(COLUMNS_JS, [[name, selector] for name, selector in columns.items()])
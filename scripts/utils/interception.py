@@ -0,0 +1,115 @@
+"""
+Request interception for scraper pages.
+Images, media, fonts and known analytics / ad hosts are aborted before they are downloaded,
+while documents, scripts, stylesheets and the XHRs the scrapers depend on go through.
+Per site allowlists keep hosts a flow needs (e.g. cookiebot for the irishrail consent dialog).
+"""
+import asyncio
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable
+from urllib.parse import urlsplit
+
+from pyppeteer.network_manager import Request
+from pyppeteer.page import Page
+
+BLOCKED_RESOURCE_TYPES = frozenset({'image', 'media', 'font', 'texttrack', 'eventsource', 'manifest'})
+
+BLOCKED_HOSTS = frozenset({
+    'google-analytics.com', 'googletagmanager.com', 'googlesyndication.com', 'googleadservices.com',
+    'doubleclick.net', 'adservice.google.com', 'facebook.net', 'facebook.com', 'connect.facebook.net',
+    'hotjar.com', 'criteo.com', 'criteo.net', 'taboola.com', 'outbrain.com', 'bing.com', 'clarity.ms',
+    'yandex.ru', 'mc.yandex.ru', 'mixpanel.com', 'segment.io', 'segment.com', 'newrelic.com', 'nr-data.net',
+    'optimizely.com', 'quantserve.com', 'scorecardresearch.com', 'adnxs.com', 'amazon-adsystem.com',
+    'tiktok.com', 'snapchat.com', 'pinterest.com', 'twitter.com', 'linkedin.com', 'cookiebot.com',
+    'consensu.org', 'onetrust.com', 'trustarc.com',
+})
+
+'''
+    Hosts (and resource types) a site needs even though the default policy blocks them.
+'''
+SITE_ALLOWED_HOSTS: Dict[str, FrozenSet[str]] = {
+    'irishrail.ie': frozenset({'cookiebot.com'}),
+}
+SITE_ALLOWED_TYPES: Dict[str, FrozenSet[str]] = {}
+
+
+def _host_matches(host: str, hosts: Iterable[str]) -> bool:
+    return any(host == blocked or host.endswith('.' + blocked) for blocked in hosts)
+
+
+class SiteStats:
+    __slots__ = ('requests', 'blocked', 'blocked_by_type', 'bytes_loaded')
+
+    def __init__(self):
+        self.requests = 0
+        self.blocked = 0
+        self.blocked_by_type: Dict[str, int] = defaultdict(int)
+        self.bytes_loaded = 0
+
+    def as_dict(self) -> Dict:
+        return {
+            'requests': self.requests,
+            'blocked': self.blocked,
+            'blocked_by_type': dict(self.blocked_by_type),
+            'bytes_loaded': self.bytes_loaded,
+        }
+
+
+stats: Dict[str, SiteStats] = defaultdict(SiteStats)
+
+
+def should_block(site: str, url: str, resource_type: str) -> bool:
+    if url.startswith('data:'):
+        return False
+    host = urlsplit(url).hostname or ''
+    allowed_hosts = SITE_ALLOWED_HOSTS.get(site, frozenset())
+    if _host_matches(host, allowed_hosts):
+        return False
+    if resource_type in BLOCKED_RESOURCE_TYPES and resource_type not in SITE_ALLOWED_TYPES.get(site, ()):
+        return True
+    return _host_matches(host, BLOCKED_HOSTS)
+
+
+class _Interceptor:
+    def __init__(self, page: Page, site: str):
+        self.page = page
+        self.site = site
+
+    async def handle(self, request: Request):
+        site_stats = stats[self.site]
+        site_stats.requests += 1
+        try:
+            if should_block(self.site, request.url, request.resourceType):
+                site_stats.blocked += 1
+                site_stats.blocked_by_type[request.resourceType] += 1
+                await request.abort()
+            else:
+                await request.continue_()
+        except Exception:
+            pass  # The request was already handled or the page navigated away
+
+    def on_request(self, request: Request):
+        asyncio.ensure_future(self.handle(request))
+
+    def on_loading_finished(self, event: Dict):
+        stats[self.site].bytes_loaded += int(event.get('encodedDataLength', 0))
+
+
+async def intercept(page: Page, site: str):
+    """
+    Enables the blocking policy of the site on the page. Safe to call before every page.goto:
+    the handlers are installed once per page and only the active site changes afterwards.
+    """
+    interceptor = getattr(page, '_scraper_interceptor', None)
+    if interceptor is not None:
+        interceptor.site = site
+        return
+    interceptor = _Interceptor(page, site)
+    page._scraper_interceptor = interceptor
+    await page.setRequestInterception(True)
+    page.on('request', interceptor.on_request)
+    page._client.on('Network.loadingFinished', interceptor.on_loading_finished)
+
+
+def report() -> Dict[str, Dict]:
+    return {site: site_stats.as_dict() for site, site_stats in stats.items()}
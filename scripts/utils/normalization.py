@@ -0,0 +1,175 @@
+"""
+Batch normalization of scraped rows into typed columns.
+A batch of rows (any number of dates and routes) is joined into one text per field and parsed with one
+compiled, line anchored regex pass, so the work is a few findall calls per batch instead of string
+juggling per dict. Results are NumPy columns:
+    departure / arrival          minutes since midnight (int16, -1 when unreadable)
+    departure_day / arrival_day  day offset of the time, "+1" suffixes or an arrival before the departure
+    amount_minor                 price in hundredths (int64, -1 when unreadable), exact like a decimal
+    currency                     ISO 4217 code ('' when unknown)
+"""
+import re
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+'''
+    Currency marks as they appear in scraped prices, mapped to ISO codes. Matched case insensitively.
+'''
+CURRENCY_SYMBOLS: Dict[str, str] = {
+    '€': 'EUR', 'eur': 'EUR', 'euro': 'EUR',
+    '$u': 'UYU', 'uyu': 'UYU',
+    'us$': 'USD', '$': 'USD', 'usd': 'USD',
+    'e£': 'EGP', 'le': 'EGP', 'egp': 'EGP',
+    '£': 'GBP', 'gbp': 'GBP',
+    '₺': 'TRY', 'tl': 'TRY', 'try': 'TRY',
+    '֏': 'AMD', 'драм': 'AMD', 'amd': 'AMD',
+    '₸': 'KZT', 'тг': 'KZT', 'тенге': 'KZT', 'kzt': 'KZT',
+    'сом': 'KGS', 'kgs': 'KGS',
+    '₽': 'RUB', 'руб': 'RUB', 'rub': 'RUB',
+    'ksh': 'KES', 'kes': 'KES',
+    'tsh': 'TZS', 'tzs': 'TZS',
+}
+
+'''
+    Currency of the prices of a site which does not print one.
+'''
+SITE_CURRENCIES: Dict[str, str] = {
+    'pv.lv': 'EUR',
+    'bahn.de': 'EUR',
+    'irishrail.ie': 'EUR',
+    'checkmybus.de': 'EUR',
+    'directferries.de': 'EUR',
+    'railways.kz': 'KZT',
+    'railway.am': 'AMD',
+    'copsa.com.uy': 'UYU',
+    'metroturizm.com.tr': 'TRY',
+    'darlux.co.tz': 'TZS',
+    'metickets.krc.co.ke': 'KES',
+    'ask-aladdin.com': 'EGP',
+    'avtobeket.kg': 'KGS',
+}
+
+_TIME_LINE = re.compile(r'^[^\d\n]*(?:(\d{1,2})\s*[:.hH]?\s*(\d{2})(?::\d{2})?[^\S\n]*(?:([aApP])\.?[mM]\.?)?)?'
+                        r'[^\n+]*(?:\+\s*(\d+))?[^\n]*$', re.M)
+_AMOUNT_LINE = re.compile(r'^[^\d\n]*(\d[\d \u00a0\u202f.,]*)?[^\n]*$', re.M)
+_AMOUNT = re.compile(r'\d[\d\s.,]*')
+_SPACES = re.compile(r'\s')
+
+
+def _token_pattern(token: str) -> str:
+    escaped = re.escape(token)
+    return rf'(?<![^\W\d_]){escaped}(?![^\W\d_])' if token[-1].isalpha() else escaped
+
+
+_CURRENCY_LINE = re.compile(
+    r'^(?:[^\n]*?(' + '|'.join(_token_pattern(token) for token in sorted(CURRENCY_SYMBOLS, key=len, reverse=True))
+    + r')|)[^\n]*$', re.M | re.I)
+
+
+def _joined(texts: Iterable) -> Optional[str]:
+    """
+    One line per text, None for an empty batch (an empty string would still match once).
+    """
+    texts = list(texts)
+    if not texts:
+        return None
+    return '\n'.join('' if text is None else str(text).replace('\n', ' ') for text in texts)
+
+
+def parse_amount(text: Union[str, float, int, None]) -> float:
+    """
+    Number in a price text: "1 200 драм" -> 1200.0, "12,50 €" -> 12.5, "1.234,50" -> 1234.5.
+    A single separator followed by three digits is read as a thousands separator.
+    :return: nan when the text holds no number.
+    """
+    if isinstance(text, (int, float)):
+        return float(text)
+    match = _AMOUNT.search(text or '')
+    if match is None:
+        return float('nan')
+    number = _SPACES.sub('', match.group()).rstrip('.,')
+    if ',' in number and '.' in number:
+        decimal = ',' if number.rfind(',') > number.rfind('.') else '.'
+        number = number.replace('.' if decimal == ',' else ',', '').replace(',', '.')
+    elif ',' in number:
+        whole, _, fraction = number.rpartition(',')
+        number = f'{whole.replace(",", "")}.{fraction}' if len(fraction) != 3 else number.replace(',', '')
+    elif number.count('.') > 1 or (number.count('.') == 1 and len(number.rpartition('.')[2]) == 3):
+        number = number.replace('.', '')
+    try:
+        return float(number)
+    except ValueError:
+        return float('nan')
+
+
+def parse_times(texts: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    "08:30", "8.30", "0830 Hrs", "8:30 PM", "01:10 +1" -> minutes since midnight and day offset.
+    :return: (minutes int16, -1 when unreadable; day offset int8)
+    """
+    joined = _joined(texts)
+    matches = _TIME_LINE.findall(joined) if joined is not None else []
+    hours = np.array([int(hour) if hour else -1 for hour, _, _, _ in matches], dtype=np.int16)
+    minutes = np.array([int(minute) if minute else 0 for _, minute, _, _ in matches], dtype=np.int16)
+    meridiem = np.array([half.lower() for _, _, half, _ in matches], dtype='<U1')
+    days = np.array([int(day) if day else 0 for _, _, _, day in matches], dtype=np.int8)
+    hours = np.where((meridiem == 'p') & (hours >= 0) & (hours < 12), hours + 12, hours)
+    hours = np.where((meridiem == 'a') & (hours == 12), 0, hours)
+    valid = (hours >= 0) & (hours < 24) & (minutes < 60)
+    return np.where(valid, hours * 60 + minutes, -1).astype(np.int16), days
+
+
+def parse_prices(texts: Sequence, default_currency: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    :return: (amount in hundredths int64, -1 when unreadable; ISO currency codes, default_currency or '')
+    """
+    joined = _joined(texts)
+    if joined is None:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype='<U3')
+    amounts = np.array([parse_amount(number) if number else np.nan for number in _AMOUNT_LINE.findall(joined)],
+                       dtype=float)
+    minor = np.where(np.isnan(amounts), -1, np.round(np.nan_to_num(amounts, nan=-1) * 100)).astype(np.int64)
+    currencies = np.array([CURRENCY_SYMBOLS.get(token.lower(), '') if token else default_currency or ''
+                           for token in _CURRENCY_LINE.findall(joined)], dtype='<U3')
+    return minor, currencies
+
+
+def normalize_rows(data: List[Dict], site: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    Typed columns of a batch of scraped rows ({'date', 'departure_time', 'arrival_time', 'price'}).
+    Arrivals earlier than their departure are moved to the next day.
+    :param site: Selects the currency of prices which do not print one.
+    """
+    departure, departure_day = parse_times([row.get('departure_time') for row in data])
+    arrival, arrival_day = parse_times([row.get('arrival_time') for row in data])
+    overnight = (arrival >= 0) & (departure >= 0) & (arrival_day <= departure_day) & (arrival < departure)
+    amount_minor, currency = parse_prices([row.get('price') for row in data], SITE_CURRENCIES.get(site))
+    return {
+        'date': np.array([row.get('date') or '' for row in data], dtype=str),
+        'departure': departure,
+        'departure_day': departure_day,
+        'arrival': arrival,
+        'arrival_day': (arrival_day + overnight).astype(np.int8),
+        'amount_minor': amount_minor,
+        'currency': currency,
+    }
+
+
+def format_minutes(minutes: np.ndarray) -> List[str]:
+    """
+    Minutes since midnight back to "HH:MM" texts, '' for unreadable ones.
+    """
+    return ['' if value < 0 else f'{value // 60:02d}:{value % 60:02d}' for value in minutes.tolist()]
+
+
+def format_times(texts: Sequence) -> List[str]:
+    """
+    Scraped times in one "HH:MM" shape: "08:30:00" -> "08:30", "8.05 PM" -> "20:05".
+    """
+    return format_minutes(parse_times(texts)[0])
+
+
+def to_decimal(amount_minor: int) -> Optional[Decimal]:
+    return None if amount_minor < 0 else Decimal(int(amount_minor)).scaleb(-2)
@@ -0,0 +1,100 @@
+"""
+Incremental "load more" pagination.
+After every page load only the rows added since the previous one are extracted and yielded, duplicates
+(by key) are dropped, and pagination stops as soon as a row leaves the wanted time window or the day
+boundary is crossed. A missing "more" button is noticed by one evaluate instead of a timeout,
+and the number of clicks is bounded.
+"""
+from pyppeteer.errors import TimeoutError
+from pyppeteer.page import Page
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from scripts.utils.extraction import QUERY_JS
+from scripts.utils.normalization import parse_times
+
+CLICK_MORE_JS = '''(selector) => {
+    %s
+    const button = query(document, selector)[0];
+    if (!button || button.disabled || !(button.offsetWidth || button.offsetHeight)) {
+        return false;
+    }
+    button.click();
+    return true;
+}''' % QUERY_JS
+
+GREW_JS = '''(selector, count) => {
+    %s
+    return query(document, selector).length > count;
+}''' % QUERY_JS
+
+
+def _minutes(text: str) -> int:
+    hours, minutes = text.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+class DayWindow:
+    """
+    Keeps the rows of one day which depart inside [start, end] ("HH:MM").
+    Departures are listed in time order, so a departure earlier than the latest one seen means
+    the list crossed midnight.
+    """
+
+    def __init__(self, start: str = '00:00', end: str = '23:59'):
+        self.start = _minutes(start)
+        self.end = _minutes(end)
+        self.latest = -1
+
+    def accept(self, rows: List[Dict], field: str = 'departure_time') -> Tuple[List[Dict], bool]:
+        """
+        :return: (rows inside the window, whether pagination is done)
+        """
+        kept = []
+        minutes, days = parse_times([row[field] for row in rows])
+        for row, minute, day in zip(rows, minutes.tolist(), days.tolist()):
+            if minute < 0:
+                kept.append(row)
+                continue
+            if day > 0 or minute < self.latest or minute > self.end:
+                return kept, True
+            self.latest = minute
+            if minute >= self.start:
+                kept.append(row)
+        return kept, False
+
+
+async def paginate(page: Page, rows: str, more: str, extract: Callable[[Page, str], Awaitable[List[Dict]]],
+                   key: Callable[[Dict], object] = lambda row: row['departure_time'],
+                   window: Optional[DayWindow] = None, max_pages: int = 20,
+                   timeout: int = 10000) -> AsyncIterator[List[Dict]]:
+    """
+    Yields the new rows of every page, the first one included.
+    :param rows: XPath of the result rows.
+    :param more: Selector (CSS or XPath) of the button which loads more rows.
+    :param extract: Reads the rows matching the given XPath.
+    :param key: Identity of a row, rows with a key already seen are dropped.
+    :param max_pages: Hard bound on "more" clicks.
+    :param timeout: Milliseconds to wait for a click to add rows.
+    """
+    seen = set()
+    count = 0
+    for clicks in range(max_pages + 1):
+        batch = await extract(page, f'({rows})[position() > {count}]')
+        count += len(batch)
+        new = []
+        for row in batch:
+            row_key = key(row)
+            if row_key not in seen:
+                seen.add(row_key)
+                new.append(row)
+        done = False
+        if window is not None:
+            new, done = window.accept(new)
+        if new:
+            yield new
+        if done or clicks == max_pages or not await page.evaluate(CLICK_MORE_JS, more):
+            return
+        try:
+            await page.waitForFunction(GREW_JS, {'polling': 'mutation', 'timeout': timeout}, rows, count)
+        except TimeoutError:
+            return
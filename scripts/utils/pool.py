@@ -0,0 +1,215 @@
+import asyncio
+from contextlib import asynccontextmanager
+from logging import Logger, getLogger
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from pyppeteer import launch
+from pyppeteer.browser import Browser
+from pyppeteer.page import Page
+
+try:
+    import psutil
+except ImportError:  # RSS is read from /proc when psutil is not installed
+    psutil = None
+
+DEFAULT_LAUNCH_OPTIONS = {
+    'headless': True,
+    'args': ['--no-sandbox', '--disable-dev-shm-usage'],
+    'handleSIGINT': False,
+    'handleSIGTERM': False,
+    'handleSIGHUP': False,
+}
+RESPAWN_DELAY = 5  # Seconds before a failed browser launch is retried, doubled on every failure up to 5 minutes
+
+
+def process_rss(pid: int) -> int:
+    """
+    Resident memory of the browser process and its renderers, in bytes.
+    """
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            return sum(p.memory_info().rss for p in [process] + process.children(recursive=True))
+        except psutil.Error:
+            return 0
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+class _BrowserSlot:
+    def __init__(self, browser: Browser, pages: List[Page]):
+        self.browser = browser
+        self.pages = pages
+        self.uses = 0
+        self.leased = 0
+        self.retiring = False
+        self.closed = False
+
+    @property
+    def rss(self) -> int:
+        process = self.browser.process
+        return process_rss(process.pid) if process else 0
+
+
+class BrowserPool:
+    """
+    Keeps `browsers` headless Chromium processes with `tabs` pre-warmed pages each and leases the pages to scrapers.
+    A browser is recycled after `max_uses` leases or once its RSS grows over `max_rss_mb`. When its replacement
+    cannot be launched, the launch is retried in the background until the pool has `browsers` browsers again.
+
+        async with pool.lease() as page:
+            total_data = await germany.get_info(page, ...)
+    """
+
+    def __init__(self, browsers: int = 2, tabs: int = 4, max_uses: int = 200, max_rss_mb: int = 1024,
+                 launch_options: Optional[Dict] = None, logger: Optional[Logger] = None):
+        self.browsers = browsers
+        self.tabs = tabs
+        self.max_uses = max_uses
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.launch_options = dict(DEFAULT_LAUNCH_OPTIONS, **(launch_options or {}))
+        self.logger = logger or getLogger(__name__)
+        self._slots: List[_BrowserSlot] = []
+        self._idle: 'asyncio.Queue' = asyncio.Queue()
+        self._recycled = 0
+        self._respawning: Set[asyncio.Task] = set()
+
+    async def start(self) -> 'BrowserPool':
+        slots = await asyncio.gather(*(self._spawn() for _ in range(self.browsers)))
+        self._slots.extend(slots)
+        return self
+
+    async def close(self):
+        for task in self._respawning:
+            task.cancel()
+        for slot in self._slots:
+            await self._close_slot(slot)
+        self._slots.clear()
+
+    async def __aenter__(self) -> 'BrowserPool':
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _spawn(self) -> _BrowserSlot:
+        browser = await launch(**self.launch_options)
+        try:
+            pages = await browser.pages()
+            while len(pages) < self.tabs:
+                pages.append(await browser.newPage())
+        except Exception:
+            await browser.close()
+            raise
+        slot = _BrowserSlot(browser, pages[:self.tabs])
+        for page in slot.pages:
+            self._idle.put_nowait((slot, page))
+        return slot
+
+    async def _close_slot(self, slot: _BrowserSlot):
+        if slot.closed:
+            return
+        slot.closed = True
+        try:
+            await slot.browser.close()
+        except Exception as error:
+            self.logger.error(f'Browser could not be closed: {error}')
+
+    async def _recycle(self, slot: _BrowserSlot):
+        '''
+            The replacement is launched before the old browser goes, so a failed launch never shrinks the pool
+            for good: it is retried in the background
+        '''
+        try:
+            replacement = await self._spawn()
+        except Exception as error:
+            self.logger.error(f'Replacement browser could not be launched: {error!r}')
+            replacement = None
+        await self._close_slot(slot)
+        self._slots.remove(slot)
+        if replacement is None:
+            task = asyncio.ensure_future(self._respawn())
+            self._respawning.add(task)
+            task.add_done_callback(self._respawning.discard)
+        else:
+            self._slots.append(replacement)
+        self._recycled += 1
+
+    async def _respawn(self):
+        delay = RESPAWN_DELAY
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                self._slots.append(await self._spawn())
+                return
+            except Exception as error:
+                delay = min(delay * 2, 300)
+                self.logger.error(f'Browser could not be launched, retrying in {delay}s: {error!r}')
+
+    async def _reset(self, slot: _BrowserSlot, page: Page) -> Page:
+        """
+        Brings a returned page back to a blank state, replacing it with a new tab if it is broken.
+        """
+        try:
+            await page.goto('about:blank')
+            return page
+        except Exception:
+            self.logger.error('Leased page is broken, opening a new tab')
+        try:
+            await page.close()
+        except Exception:
+            pass
+        new_page = await slot.browser.newPage()
+        slot.pages[slot.pages.index(page)] = new_page
+        return new_page
+
+    async def acquire(self) -> Tuple[_BrowserSlot, Page]:
+        while True:
+            slot, page = await self._idle.get()
+            if slot.closed or slot.retiring:
+                continue
+            slot.leased += 1
+            return slot, page
+
+    async def release(self, slot: _BrowserSlot, page: Page):
+        slot.leased -= 1
+        slot.uses += 1
+        if not slot.retiring and (slot.uses >= self.max_uses or slot.rss > self.max_rss):
+            slot.retiring = True
+        if slot.retiring:
+            if slot.leased == 0:
+                await self._recycle(slot)
+            return
+        self._idle.put_nowait((slot, await self._reset(slot, page)))
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[Page]:
+        slot, page = await self.acquire()
+        try:
+            yield page
+        finally:
+            await self.release(slot, page)
+
+    def occupancy(self) -> Dict:
+        """
+        Snapshot of the pool: how many tabs exist, how many are leased right now and per browser usage.
+        """
+        live = [slot for slot in self._slots if not slot.closed]
+        return {
+            'browsers': len(live),
+            'tabs': sum(len(slot.pages) for slot in live),
+            'leased': sum(slot.leased for slot in live),
+            'idle': sum(len(slot.pages) - slot.leased for slot in live if not slot.retiring),
+            'recycled': self._recycled,
+            'respawning': len(self._respawning),
+            'per_browser': [
+                {'uses': slot.uses, 'leased': slot.leased, 'retiring': slot.retiring, 'rss': slot.rss}
+                for slot in live
+            ],
+        }
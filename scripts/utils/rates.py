@@ -0,0 +1,134 @@
+"""
+Currency rate service.
+One EUR based rate table per process, loaded from a local snapshot or fetched over HTTP,
+refreshed when it is older than RATES_MAX_AGE. Loading and refreshing only happen in ready() and
+refresh_forever(), off the event loop; conversions read the table in memory. Conversion of a whole data list
+is one call: amounts are parsed once and multiplied as an array, with no I/O per row.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from logging import Logger, getLogger
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import requests
+
+from configurations.settings import DARK_PURPLE, ENDE
+from scripts.utils.normalization import parse_amount
+
+'''
+    Rates of one EUR in every currency. The ECB table (and currency_converter, which ships it)
+    has no AMD, KGS, KZT, KES, TZS, UYU or EGP, so a table covering them is used.
+'''
+RATES_URL = 'https://open.er-api.com/v6/latest/EUR'
+RATES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pickles', 'rates.json')
+RATES_MAX_AGE = 12 * 60 * 60
+
+
+class RateTable:
+    def __init__(self, path: str = RATES_PATH, max_age: float = RATES_MAX_AGE, logger: Optional[Logger] = None):
+        self.path = path
+        self.max_age = max_age
+        self.logger = logger or getLogger(__name__)
+        self.rates: Dict[str, float] = {}
+        self.fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def load(self) -> bool:
+        try:
+            with open(self.path, encoding='utf-8') as rates_file:
+                stored = json.load(rates_file)
+        except (OSError, ValueError):
+            return False
+        self.rates = stored['rates']
+        self.fetched_at = stored['fetched_at']
+        return True
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as rates_file:
+            json.dump({'fetched_at': self.fetched_at, 'rates': self.rates}, rates_file)
+
+    def refresh(self) -> bool:
+        try:
+            res = requests.get(RATES_URL, timeout=30)
+            res.raise_for_status()
+            rates = res.json()['rates']
+        except (requests.RequestException, ValueError, KeyError) as error:
+            self.logger.error(f'{DARK_PURPLE}Currency rates could not be fetched: {error}{ENDE}')
+            return False
+        self.rates = {code.upper(): float(rate) for code, rate in rates.items()}
+        self.rates['EUR'] = 1.0
+        self.fetched_at = time.time()
+        self.save()
+        return True
+
+    def ensure_fresh(self) -> bool:
+        """
+        Loads the table on first use and re-fetches it once it is older than max_age.
+        A stale table is kept when the refresh fails.
+        """
+        with self._lock:
+            if not self.rates:
+                self.load()
+            if not self.rates or time.time() - self.fetched_at > self.max_age:
+                self.refresh()
+        return bool(self.rates)
+
+    async def ready(self) -> bool:
+        """
+        ensure_fresh for coroutines, run in a thread so a fetch never blocks the event loop.
+        """
+        return await asyncio.get_event_loop().run_in_executor(None, self.ensure_fresh)
+
+    async def refresh_forever(self, interval: Optional[float] = None):
+        """
+        Keeps the table fresh from a long running process.
+        """
+        loop = asyncio.get_event_loop()
+        while True:
+            await loop.run_in_executor(None, self.refresh)
+            await asyncio.sleep(interval or self.max_age)
+
+    def rate(self, currency: str) -> Optional[float]:
+        """
+        Units of the currency per EUR, None when it is not in the table (or the table is not loaded yet).
+        Never fetches: call ready() first, or keep refresh_forever() running.
+        """
+        return self.rates.get(currency.upper())
+
+    def convert(self, amounts: Sequence[Union[str, float]], currency: str, target: str = 'EUR') -> np.ndarray:
+        """
+        Converts all amounts at once. Texts are parsed with parse_amount, unparsable ones become nan.
+        :raise KeyError: When either currency is not in the table.
+        """
+        source_rate, target_rate = self.rate(currency), self.rate(target)
+        if source_rate is None or target_rate is None:
+            raise KeyError(currency if source_rate is None else target)
+        values = np.fromiter((parse_amount(amount) for amount in amounts), dtype=float, count=len(amounts))
+        return np.round(values * (target_rate / source_rate), 2)
+
+    def to_eur(self, data: List[Dict], currency: str) -> List[Dict]:
+        """
+        Rewrites the "price" of every row of a scraper's data list to EUR, in place.
+        All or nothing: when there is no rate, or any price has no number, every row keeps its original text.
+        """
+        if not data:
+            return data
+        try:
+            converted = self.convert([row['price'] for row in data], currency)
+        except KeyError as error:
+            self.logger.error(f'{DARK_PURPLE}No {error.args[0]} rate, prices are left in {currency}{ENDE}')
+            return data
+        if np.isnan(converted).any():
+            self.logger.error(f'{DARK_PURPLE}Unreadable prices, prices are left in {currency}{ENDE}')
+            return data
+        for row, price in zip(data, converted.tolist()):
+            row['price'] = price
+        return data
+
+
+rates = RateTable()
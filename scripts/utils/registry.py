@@ -0,0 +1,199 @@
+"""
+Scraper plugins by country_id.
+Every scraper module is reached through the same async interface (get_info / stream_info with the usual
+parameters) whatever its own shape, and is only imported the first time one of its countries is requested,
+in an executor thread so that heavy imports (pandas, bs4, ...) do not block the event loop. A worker which
+never sees a country never pays for its module.
+Which module serves a country_id is deployment data (the ids are those of the countries table in the DB):
+a JSON object {"<country_id>": "<module>"} read from SCRAPER_COUNTRIES, and/or Registry.register calls.
+"""
+import asyncio
+import importlib
+import json
+import os
+from functools import partial
+from logging import Logger
+from pyppeteer.page import Page
+from types import ModuleType
+from typing import AsyncIterator, Dict, List, Optional
+
+from scripts.utils.scheduler import Job
+from scripts.utils.streaming import stream_of
+
+
+class Plugin:
+    """
+    :param module: Module name under `scripts`.
+    :param site: Domain of the scraped site, selects the scheduler's rate limit.
+    :param frame: The module's get_info is synchronous, takes (origin, destination, **params) and returns a
+                  DataFrame, which its to_rows(data, date, logger) turns into data rows (None, status 400,
+                  when the frame does not have the expected layout).
+    """
+
+    def __init__(self, module: str, site: str, frame: bool = False):
+        self.name = module
+        self.site = site
+        self.frame = frame
+        self._module: Optional[ModuleType] = None
+        self._loading: Optional[asyncio.Future] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    async def load(self) -> ModuleType:
+        if self._module is None:
+            if self._loading is None:
+                self._loading = asyncio.get_event_loop().run_in_executor(
+                    None, importlib.import_module, f'scripts.{self.name}')
+            try:
+                self._module = await asyncio.shield(self._loading)
+            except Exception:
+                self._loading = None
+                raise
+        return self._module
+
+    async def get_info(
+            self,
+            page: Page,
+            country_id: int,
+            origin: str,
+            origin_id: int,
+            destination: str,
+            destination_id: int,
+            total_size: int,
+            hash_id: str,
+            order: int,
+            date: str,
+            logger: Logger) -> Dict:
+        module = await self.load()
+        if not self.frame:
+            return await module.get_info(page, country_id, origin, origin_id, destination, destination_id,
+                                         total_size, hash_id, order, date, logger)
+        data = await asyncio.get_event_loop().run_in_executor(None, partial(
+            module.get_info, origin, destination, page=page, country_id=country_id, origin_id=origin_id,
+            destination_id=destination_id, total_size=total_size, hash_id=hash_id, order=order, date=date,
+            logger=logger))
+        list_dict = module.to_rows(data, date, logger)
+        return {
+            'country_id': country_id,
+            'origin_id': origin_id,
+            'destination_id': destination_id,
+
+            'data': list_dict or [],
+            'total_size': total_size,
+            'order': order,
+            'hash_id': hash_id,
+            'status': 200 if list_dict else 400
+        }
+
+    async def stream_info(self, *params) -> AsyncIterator[List[Dict]]:
+        """
+        The module's stream_info, or its get_info streamed in chunks when it has none.
+        Takes the parameters of get_info, in the same order.
+        """
+        module = await self.load()
+        stream = getattr(module, 'stream_info', None) if not self.frame else None
+        async for rows in (stream(*params) if stream is not None else stream_of(self.get_info, *params)):
+            yield rows
+
+
+DEFAULT_COUNTRIES_PATH = os.environ.get(
+    'SCRAPER_COUNTRIES', os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                      'configurations', 'scraper_countries.json'))
+
+'''
+    module -> Plugin, one per scraper module. Sites covering several countries serve several country ids.
+'''
+PLUGINS: Dict[str, Plugin] = {plugin.name: plugin for plugin in [
+    Plugin('armenia', 'railway.am'),
+    Plugin('egipt', 'ask-aladdin.com'),
+    Plugin('germany', 'bahn.de'),
+    Plugin('international', 'busbud.com'),
+    Plugin('international2', 'checkmybus.de'),
+    Plugin('irland', 'irishrail.ie'),
+    Plugin('kazakhistan', 'railways.kz'),
+    Plugin('kenya', 'metickets.krc.co.ke'),
+    Plugin('kirgizistan', 'avtobeket.kg', frame=True),
+    Plugin('latvia', 'pv.lv'),
+    Plugin('port_international', 'directferries.de'),
+    Plugin('tanzania', 'darlux.co.tz'),
+    Plugin('turkey', 'metroturizm.com.tr'),
+    Plugin('uruguay', 'copsa.com.uy'),
+]}
+
+
+class Registry:
+    def __init__(self, path: str = DEFAULT_COUNTRIES_PATH, plugins: Optional[Dict[str, Plugin]] = None):
+        self.path = path
+        self.plugins: Dict[str, Plugin] = dict(PLUGINS if plugins is None else plugins)
+        self._countries: Optional[Dict[int, str]] = None
+
+    @property
+    def countries(self) -> Dict[int, str]:
+        if self._countries is None:
+            try:
+                with open(self.path, encoding='utf-8') as countries_file:
+                    stored = json.load(countries_file)
+                self._countries = {int(country_id): module for country_id, module in stored.items()}
+            except (OSError, ValueError):
+                self._countries = {}
+        return self._countries
+
+    def register(self, country_id: int, module: str):
+        if module not in self.plugins:
+            raise KeyError(f'No scraper module {module}')
+        self.countries[country_id] = module
+
+    def plugin(self, country_id: int) -> Plugin:
+        module = self.countries.get(country_id)
+        if module is None:
+            raise KeyError(f'No scraper registered for country {country_id} (see {self.path})')
+        return self.plugins[module]
+
+    async def get_info(
+            self,
+            page: Page,
+            country_id: int,
+            origin: str,
+            origin_id: int,
+            destination: str,
+            destination_id: int,
+            total_size: int,
+            hash_id: str,
+            order: int,
+            date: str,
+            logger: Logger) -> Dict:
+        return await self.plugin(country_id).get_info(page, country_id, origin, origin_id, destination,
+                                                      destination_id, total_size, hash_id, order, date, logger)
+
+    def stream_info(
+            self,
+            page: Page,
+            country_id: int,
+            origin: str,
+            origin_id: int,
+            destination: str,
+            destination_id: int,
+            total_size: int,
+            hash_id: str,
+            order: int,
+            date: str,
+            logger: Logger) -> AsyncIterator[List[Dict]]:
+        return self.plugin(country_id).stream_info(page, country_id, origin, origin_id, destination,
+                                                   destination_id, total_size, hash_id, order, date, logger)
+
+    def job(self, country_id: int, origin: str, origin_id: int, destination: str, destination_id: int, date: str,
+            hash_id: str, order: int, total_size: int) -> Job:
+        """
+        Scheduler job of the country's scraper, without loading its module yet.
+        """
+        plugin = self.plugin(country_id)
+        return Job(plugin.site, plugin.get_info, country_id, origin, origin_id, destination, destination_id, date,
+                   hash_id, order, total_size)
+
+    def loaded(self) -> List[str]:
+        return sorted(name for name, plugin in self.plugins.items() if plugin.loaded)
+
+
+registry = Registry()
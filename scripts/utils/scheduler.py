@@ -0,0 +1,253 @@
+import asyncio
+import time
+from collections import deque
+from logging import Logger, getLogger
+from typing import AsyncIterator, Callable, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from configurations.settings import DARK_PURPLE, ENDE
+from scripts.utils.cache import ResultCache
+from scripts.utils.coalescing import SingleFlight, single_flight
+from scripts.utils.pool import BrowserPool
+
+'''
+    Per domain limits: (max concurrent tabs, max requests per second).
+    Domains which are not listed get DEFAULT_LIMIT.
+'''
+DEFAULT_LIMIT = (2, 1.0)
+DOMAIN_LIMITS: Dict[str, Tuple[int, float]] = {
+    'busbud.com': (3, 1.0),
+    'checkmybus.de': (2, 0.5),
+    'bahn.de': (2, 0.5),
+    'railways.kz': (2, 0.5),
+    'railway.am': (1, 0.5),
+    'irishrail.ie': (2, 0.5),
+    'directferries.de': (1, 0.25),
+    'metroturizm.com.tr': (2, 0.5),
+    'copsa.com.uy': (2, 0.5),
+    'pv.lv': (2, 0.5),
+    'darlux.co.tz': (2, 0.5),
+    'metickets.krc.co.ke': (1, 0.25),
+    'ask-aladdin.com': (1, 0.25),
+}
+
+
+class Job(NamedTuple):
+    """
+    One split of a larger job. `get_info` is the scraper coroutine, `domain` selects the rate limit.
+    A `refresh` job re-scrapes a stale cached result in the background; its result is not yielded.
+    """
+    domain: str
+    get_info: Callable
+    country_id: int
+    origin: str
+    origin_id: int
+    destination: str
+    destination_id: int
+    date: str
+    hash_id: str
+    order: int
+    total_size: int
+    refresh: bool = False
+
+
+class _Domain:
+    def __init__(self, name: str, concurrency: int, rate: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.interval = 1.0 / rate if rate else 0.0
+        self.pending: Deque[Job] = deque()
+        self.running = 0
+        self.next_start = 0.0
+
+    def ready_in(self, now: float) -> Optional[float]:
+        """
+        Seconds until a job of this domain may start, None when nothing can start (empty or at its cap).
+        """
+        if not self.pending or self.running >= self.concurrency:
+            return None
+        return max(0.0, self.next_start - now)
+
+
+class Scheduler:
+    """
+    Runs a batch of jobs concurrently over the tabs of a BrowserPool.
+    Every tab is driven by one worker. A worker prefers its home domain and steals work
+    from the other domains whenever its own one is empty, at its concurrency cap or rate limited.
+    With a ResultCache, jobs answered by the cache are yielded at once and never take a domain slot;
+    stale answers are refreshed by a queued refresh job, under the domain's limits like any other.
+    Identical jobs running at the same time (same domain, route and date) share one scrape through `flights`.
+    """
+
+    def __init__(self, pool: BrowserPool, limits: Optional[Dict[str, Tuple[int, float]]] = None,
+                 logger: Optional[Logger] = None, cache: Optional[ResultCache] = None,
+                 flights: SingleFlight = single_flight):
+        self.pool = pool
+        self.cache = cache
+        self.flights = flights
+        self.limits = dict(DOMAIN_LIMITS, **(limits or {}))
+        self.logger = logger or getLogger(__name__)
+        self._domains: Dict[str, _Domain] = {}
+        self._changed = asyncio.Condition()
+
+    def _domain(self, name: str) -> _Domain:
+        if name not in self._domains:
+            concurrency, rate = self.limits.get(name, DEFAULT_LIMIT)
+            self._domains[name] = _Domain(name, concurrency, rate)
+        return self._domains[name]
+
+    def _pick(self, home: Optional[str]) -> Tuple[Optional[_Domain], Optional[float]]:
+        """
+        Chooses the domain to take the next job from: the home domain if it is ready, otherwise
+        the ready domain with the longest backlog. Returns the shortest wait when nothing is ready.
+        """
+        now = time.monotonic()
+        best, best_backlog, wait = None, -1, None
+        for domain in self._domains.values():
+            ready_in = domain.ready_in(now)
+            if ready_in is None:
+                continue
+            if ready_in > 0:
+                wait = ready_in if wait is None else min(wait, ready_in)
+                continue
+            if domain.name == home:
+                return domain, None
+            if len(domain.pending) > best_backlog:
+                best, best_backlog = domain, len(domain.pending)
+        return best, wait
+
+    def _has_pending(self) -> bool:
+        return any(domain.pending for domain in self._domains.values())
+
+    async def _next_job(self, home: Optional[str]) -> Optional[Tuple[_Domain, Job]]:
+        async with self._changed:
+            while self._has_pending():
+                domain, wait = self._pick(home)
+                if domain is not None:
+                    domain.running += 1
+                    domain.next_start = time.monotonic() + domain.interval
+                    return domain, domain.pending.popleft()
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+            return None
+
+    async def _finish(self, domain: _Domain):
+        async with self._changed:
+            domain.running -= 1
+            self._changed.notify_all()
+
+    @staticmethod
+    def _key(job: Job) -> Tuple[str, int, int, int, str]:
+        return job.domain, job.country_id, job.origin_id, job.destination_id, job.date
+
+    @staticmethod
+    def _envelope(job: Job, data: List[Dict], status: int) -> Dict:
+        return {
+            'country_id': job.country_id,
+            'origin_id': job.origin_id,
+            'destination_id': job.destination_id,
+
+            'data': data,
+            'total_size': job.total_size,
+            'order': job.order,
+            'hash_id': job.hash_id,
+            'status': status
+        }
+
+    async def _fetch(self, job: Job) -> Tuple[List[Dict], int]:
+        result = await self._scrape(job)
+        if self.cache is not None:
+            self.cache.store(self._key(job), result)
+        return result['data'], result['status']
+
+    async def _run_job(self, job: Job) -> Dict:
+        try:
+            data, status = await self.flights.do((job.domain, job.origin_id, job.destination_id, job.date),
+                                                 lambda: self._fetch(job))
+        finally:
+            if self.cache is not None and job.refresh:
+                self.cache.release(self._key(job))
+        return self._envelope(job, data, status)
+
+    def _answer(self, job: Job) -> Optional[Dict]:
+        """
+        The envelope of a job the cache answers, queueing a refresh job when the answer is stale.
+        """
+        answered = self.cache.answer(self._key(job)) if self.cache is not None else None
+        if answered is None:
+            return None
+        data, status, refresh = answered
+        if refresh:
+            self._domain(job.domain).pending.append(job._replace(refresh=True))
+        return self._envelope(job, data, status)
+
+    async def _scrape(self, job: Job) -> Dict:
+        async with self.pool.lease() as page:
+            try:
+                return await job.get_info(
+                    page, job.country_id, job.origin, job.origin_id, job.destination, job.destination_id,
+                    job.total_size, job.hash_id, job.order, job.date, self.logger)
+            except Exception as error:
+                self.logger.error(f'{DARK_PURPLE}{job.domain} failed: {error}{ENDE}')
+                return {
+                    'country_id': job.country_id,
+                    'origin_id': job.origin_id,
+                    'destination_id': job.destination_id,
+
+                    'data': [],
+                    'total_size': job.total_size,
+                    'order': job.order,
+                    'hash_id': job.hash_id,
+                    'status': 500  # Scraper crashed
+                }
+
+    async def _worker(self, home: Optional[str], results: 'asyncio.Queue'):
+        while True:
+            picked = await self._next_job(home)
+            if picked is None:
+                return
+            domain, job = picked
+            try:
+                result = await self._run_job(job)
+                if not job.refresh:
+                    await results.put(result)
+            finally:
+                await self._finish(domain)
+
+    async def results(self, jobs: Iterable[Job], workers: Optional[int] = None) -> AsyncIterator[Dict]:
+        """
+        Runs the jobs and yields every result dict as soon as its scraper returns.
+        Results answered by the cache come first, the refreshes of stale ones finish before the end.
+        :param jobs: Jobs to run, in any order.
+        :param workers: Number of concurrent workers, defaults to the number of tabs in the pool.
+        """
+        answered = []
+        for job in jobs:
+            result = self._answer(job)
+            if result is None:
+                self._domain(job.domain).pending.append(job)
+            else:
+                answered.append(result)
+        workers = workers or self.pool.occupancy()['tabs'] or 1
+        homes: List[Optional[str]] = list(self._domains) or [None]
+        results: 'asyncio.Queue' = asyncio.Queue(maxsize=workers)
+        tasks = [asyncio.ensure_future(self._worker(homes[i % len(homes)], results)) for i in range(workers)]
+        done = asyncio.gather(*tasks)
+        try:
+            for result in answered:
+                yield result
+            while not (done.done() and results.empty()):
+                getter = asyncio.ensure_future(results.get())
+                await asyncio.wait([getter, done], return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield getter.result()
+                else:
+                    getter.cancel()
+            done.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def run(self, jobs: Iterable[Job], workers: Optional[int] = None) -> List[Dict]:
+        return [result async for result in self.results(jobs, workers)]
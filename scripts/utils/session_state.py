@@ -0,0 +1,154 @@
+"""
+Per site session state (cookies and localStorage) kept across runs.
+The consent wall of a site is clicked once; its cookies and localStorage are then saved and injected into
+every page before page.goto, so later runs never see the wall nor wait for it. A state older than
+SESSION_MAX_AGE, or whose consent cookie expired, is dropped and the wall is clicked (and saved) again.
+"""
+import json
+import os
+import time
+from logging import Logger
+from pyppeteer.errors import TimeoutError
+from pyppeteer.page import Page
+from typing import Dict, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+from configurations.settings import DARK_PURPLE, ENDE, INBOX, LIGHT_BLUE
+from scripts.utils.extraction import QUERY_JS
+from scripts.utils.waiting import Condition, wait_first
+
+SESSION_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pickles',
+                            'session_state.json')
+SESSION_MAX_AGE = 7 * 24 * 60 * 60
+
+LOCAL_STORAGE_JS = '''(origin, items) => {
+    if (location.origin !== origin) {
+        return;
+    }
+    for (const [key, value] of Object.entries(items)) {
+        if (localStorage.getItem(key) === null) {
+            localStorage.setItem(key, value);
+        }
+    }
+}'''
+
+CLICK_JS = '''(selector) => {
+    %s
+    const node = query(document, selector)[0];
+    if (!node) {
+        return false;
+    }
+    node.click();
+    return true;
+}''' % QUERY_JS
+
+WALL_VISIBLE_JS = '''(selector) => {
+    %s
+    return query(document, selector).some((node) => !!(node.offsetWidth || node.offsetHeight));
+}''' % QUERY_JS
+
+
+class Consent(NamedTuple):
+    """
+    The consent wall of a site.
+    :param wall: Condition which shows the wall is up.
+    :param accept: Selector (CSS or XPath) clicked to accept.
+    :param cookie: Name of the cookie which records the consent, None when unknown.
+    :param timeout: Milliseconds to wait for the wall when no state is stored.
+    """
+    wall: Condition
+    accept: str
+    cookie: Optional[str] = None
+    timeout: int = 10000
+
+
+class SessionStore:
+    def __init__(self, path: str = SESSION_PATH, max_age: float = SESSION_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._states: Optional[Dict[str, Dict]] = None
+
+    @property
+    def states(self) -> Dict[str, Dict]:
+        if self._states is None:
+            try:
+                with open(self.path, encoding='utf-8') as states_file:
+                    self._states = json.load(states_file)
+            except (OSError, ValueError):
+                self._states = {}
+        return self._states
+
+    def _write(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as states_file:
+            json.dump(self.states, states_file, ensure_ascii=False)
+
+    def valid(self, site: str, consent: Optional[Consent] = None, now: Optional[float] = None) -> Optional[Dict]:
+        """
+        The stored state of the site, None when there is none or it went stale.
+        """
+        now = time.time() if now is None else now
+        state = self.states.get(site)
+        if state is None or now - state['saved_at'] > self.max_age:
+            return None
+        if consent is not None and consent.cookie:
+            cookie = next((cookie for cookie in state['cookies'] if cookie['name'] == consent.cookie), None)
+            if cookie is None or 0 < cookie.get('expires', -1) < now:
+                return None
+        return state
+
+    async def restore(self, page: Page, site: str, consent: Optional[Consent] = None) -> bool:
+        """
+        Injects the stored cookies and localStorage of the site into the page. Call it before page.goto.
+        :return: False when there is no usable state, the consent has to be given again.
+        """
+        state = self.valid(site, consent)
+        if state is None:
+            return False
+        if state['cookies']:
+            await page.setCookie(*state['cookies'])
+        injected = getattr(page, '_scraper_session_sites', None)
+        if injected is None:
+            injected = page._scraper_session_sites = set()
+        if state['local_storage'] and site not in injected:
+            '''
+                Registered once per page: pooled pages keep their new-document scripts between leases
+            '''
+            await page.evaluateOnNewDocument(LOCAL_STORAGE_JS, state['origin'], state['local_storage'])
+            injected.add(site)
+        return True
+
+    async def save(self, page: Page, site: str):
+        url = urlsplit(page.url)
+        self.states[site] = {
+            'saved_at': time.time(),
+            'origin': f'{url.scheme}://{url.netloc}',
+            'cookies': await page.cookies(),
+            'local_storage': await page.evaluate('() => Object.assign({}, window.localStorage)'),
+        }
+        self._write()
+
+    async def consent(self, page: Page, site: str, consent: Consent, restored: bool, logger: Logger):
+        """
+        Call it after page.goto. With a restored state only checks, without waiting, that no wall is up;
+        otherwise (or if the wall is up anyway) waits for the wall, accepts it and saves the new state.
+        """
+        wall = consent.wall if isinstance(consent.wall, str) else consent.wall[0]
+        if restored and not await page.evaluate(WALL_VISIBLE_JS, wall):
+            return
+        if await wait_first(page, {'wall': consent.wall}, consent.timeout) is None \
+                or not await page.evaluate(CLICK_JS, consent.accept):
+            logger.error(f'{DARK_PURPLE}Consent wall not found {ENDE}{INBOX}{LIGHT_BLUE}"{consent.accept}"{ENDE}')
+            return
+        '''
+            The consent cookie is written once the wall closes; a wall which stays up is not saved as accepted
+        '''
+        try:
+            await page.waitForFunction(f'(selector) => !({WALL_VISIBLE_JS})(selector)', {'timeout': 5000}, wall)
+        except TimeoutError:
+            logger.error(f'{DARK_PURPLE}Consent wall did not close {ENDE}{INBOX}{LIGHT_BLUE}"{consent.accept}"{ENDE}')
+            return
+        await self.save(page, site)
+
+
+session_state = SessionStore()
@@ -0,0 +1,84 @@
+"""
+Streaming scraper results.
+A streaming scraper (`stream_info`, same parameters as get_info) is an async generator which yields lists of
+rows as soon as they are extracted, e.g. one list per "later" page of bahn.de, instead of returning one dict
+at the end. Nothing runs ahead of the consumer: the next page is only loaded when the consumer asks for the
+next chunk, so a slow consumer slows the scraper down instead of piling rows up in memory.
+`collect` turns a stream back into the usual result dict, `stream_of` streams a get_info which has no
+streaming variant.
+Streamed rows are the raw texts get_info returns. Typed values are up to the consumer, one call per chunk:
+    async for rows in stream:
+        columns = normalize_rows(rows, site)    # scripts.utils.normalization
+"""
+from logging import Logger
+from pyppeteer.page import Page
+from typing import AsyncIterator, Awaitable, Callable, Dict, List
+
+STREAM_CHUNK = 25
+
+
+class NoResults(Exception):
+    """
+    Raised by a stream when the search found nothing (status 400), before or after some chunks.
+    """
+
+
+def chunks(rows: List[Dict], size: int = STREAM_CHUNK) -> List[List[Dict]]:
+    return [rows[start:start + size] for start in range(0, len(rows), size)]
+
+
+async def collect(
+        stream: AsyncIterator[List[Dict]],
+        country_id: int,
+        origin_id: int,
+        destination_id: int,
+        total_size: int,
+        hash_id: str,
+        order: int) -> Dict:
+    """
+    Drains the stream into the result dict get_info returns.
+    """
+    list_dict = []
+    status = 200  # Success
+    try:
+        async for rows in stream:
+            list_dict.extend(rows)
+    except NoResults:
+        list_dict = []
+        status = 400  # No data found
+    return {
+        'country_id': country_id,
+        'origin_id': origin_id,
+        'destination_id': destination_id,
+
+        'data': list_dict,
+        'total_size': total_size,
+        'order': order,
+        'hash_id': hash_id,
+        'status': status
+    }
+
+
+async def stream_of(
+        get_info: Callable[..., Awaitable[Dict]],
+        page: Page,
+        country_id: int,
+        origin: str,
+        origin_id: int,
+        destination: str,
+        destination_id: int,
+        total_size: int,
+        hash_id: str,
+        order: int,
+        date: str,
+        logger: Logger,
+        size: int = STREAM_CHUNK) -> AsyncIterator[List[Dict]]:
+    """
+    Streams the rows of a scraper which only has get_info, in chunks of `size`, once it returned.
+    """
+    result = await get_info(page, country_id, origin, origin_id, destination, destination_id,
+                            total_size, hash_id, order, date, logger)
+    if result['status'] != 200:
+        raise NoResults(result['status'])
+    for rows in chunks(result['data'], size):
+        yield rows
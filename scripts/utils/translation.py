@@ -0,0 +1,135 @@
+"""
+Cached city name translation.
+Lookups go through an in-memory LRU, then an on-disk SQLite store keyed by (text, src, tgt).
+Only misses reach google_translator, and they run in a thread so the event loop is never blocked.
+
+Pre-warm the store from a city list (one name per line):
+    python -m scripts.utils.translation cities.txt --tgt ru de lv en
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+DEFAULT_DB_PATH = os.environ.get(
+    'TRANSLATIONS_DB', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                    'pickles', 'translations.sqlite3'))
+
+Key = Tuple[str, str, str]
+
+
+class TranslationCache:
+    def __init__(self, path: str = DEFAULT_DB_PATH, lru_size: int = 4096):
+        self.path = path
+        self.lru_size = lru_size
+        self._lru: 'OrderedDict[Key, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._translator = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute('CREATE TABLE IF NOT EXISTS translations ('
+                             'text TEXT, src TEXT, tgt TEXT, translated TEXT, PRIMARY KEY (text, src, tgt))')
+            self._db.commit()
+        return self._db
+
+    def _remember(self, key: Key, value: str):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get(self, text: str, lang_src: str, lang_tgt: str) -> Optional[str]:
+        key = (text, lang_src, lang_tgt)
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return self._lru[key]
+            row = self.db.execute('SELECT translated FROM translations WHERE text=? AND src=? AND tgt=?',
+                                  key).fetchone()
+            if row is None:
+                return None
+            self._remember(key, row[0])
+            self.hits += 1
+            return row[0]
+
+    def put(self, text: str, lang_src: str, lang_tgt: str, translated: str):
+        key = (text, lang_src, lang_tgt)
+        with self._lock:
+            self.db.execute('INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)', key + (translated,))
+            self.db.commit()
+            self._remember(key, translated)
+
+    def _fetch(self, text: str, lang_src: str, lang_tgt: str) -> str:
+        if self._translator is None:
+            from google_trans_new import google_translator
+            self._translator = google_translator()
+        with self._lock:
+            self.misses += 1
+        translated = self._translator.translate(text, lang_src=lang_src, lang_tgt=lang_tgt)
+        self.put(text, lang_src, lang_tgt, translated)
+        return translated
+
+    def translate_sync(self, text: str, lang_tgt: str, lang_src: str = 'auto') -> str:
+        """
+        Blocking variant, for the synchronous scrapers.
+        """
+        cached = self.get(text, lang_src, lang_tgt)
+        return cached if cached is not None else self._fetch(text, lang_src, lang_tgt)
+
+    async def translate(self, text: str, lang_tgt: str, lang_src: str = 'auto') -> str:
+        cached = self.get(text, lang_src, lang_tgt)
+        if cached is not None:
+            return cached
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self._fetch, text, lang_src, lang_tgt)
+
+    def prewarm(self, texts: Iterable[str], targets: Iterable[str], lang_src: str = 'en') -> int:
+        """
+        Translates every text into every target language which is not stored yet.
+        Translations from a given source language are stored for lang_src='auto' too, which is what
+        the scrapers of sites with mixed spellings (latvia, uruguay) ask for.
+        :return: Number of translations fetched.
+        """
+        fetched = 0
+        for text in texts:
+            for lang_tgt in targets:
+                translated = self.get(text, lang_src, lang_tgt)
+                if translated is None:
+                    translated = self._fetch(text, lang_src, lang_tgt)
+                    fetched += 1
+                if lang_src != 'auto' and self.get(text, 'auto', lang_tgt) is None:
+                    self.put(text, 'auto', lang_tgt, translated)
+        return fetched
+
+
+translation_cache = TranslationCache()
+
+
+async def translate(text: str, lang_tgt: str, lang_src: str = 'auto') -> str:
+    return await translation_cache.translate(text, lang_tgt, lang_src)
+
+
+def translate_sync(text: str, lang_tgt: str, lang_src: str = 'auto') -> str:
+    return translation_cache.translate_sync(text, lang_tgt, lang_src)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pre-warm the city name translation store.')
+    parser.add_argument('cities', help='File with one city name per line.')
+    parser.add_argument('--src', default='en', help="Source language; the entries also answer lang_src='auto'.")
+    parser.add_argument('--tgt', nargs='+', default=['ru', 'de', 'lv', 'en'])
+    args = parser.parse_args()
+    with open(args.cities, encoding='utf-8') as cities_file:
+        cities = [line.strip() for line in cities_file if line.strip()]
+    print(f'{translation_cache.prewarm(cities, args.tgt, args.src)} translations fetched into {translation_cache.path}')
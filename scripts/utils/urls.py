@@ -0,0 +1,188 @@
+"""
+Result URL templating.
+Sites which encode the search in the results URL can be opened on the results directly,
+skipping the whole form flow. URLs come from a static builder (bahn.de) or are learned:
+after a successful form search the scraper stores the results URL with its date replaced by a
+placeholder, so the next query of the same route only substitutes the date.
+Per site latency of both paths is kept in `latency`.
+"""
+import json
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from logging import Logger
+from pyppeteer.errors import PageError, TimeoutError
+from pyppeteer.page import Page
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import quote, urlencode
+
+from scripts.utils.interception import intercept
+
+DEFAULT_TEMPLATES_PATH = os.environ.get(
+    'RESULT_URLS', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'pickles', 'result_urls.json'))
+
+DATE_PLACEHOLDER = '{date}'
+
+
+def build_bahn(origin: str, destination: str, date: str) -> str:
+    """
+    HAFAS deep link of the bahn.de timetable: origin / destination names and the day, starting at midnight.
+    """
+    return 'https://reiseauskunft.bahn.de/bin/query.exe/dn?' + urlencode({
+        'S': origin,
+        'Z': destination,
+        'date': datetime.fromisoformat(date).strftime('%d.%m.%y'),
+        'time': '00:00',
+        'start': '1',
+    })
+
+
+BUILDERS: Dict[str, Callable[[str, str, str], str]] = {
+    'bahn.de': build_bahn,
+}
+
+
+class _Latency:
+    __slots__ = ('count', 'total')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+
+
+latency: Dict[str, Dict[str, _Latency]] = defaultdict(lambda: defaultdict(_Latency))
+
+
+def record_latency(site: str, path: str, started: float):
+    """
+    :param path: "url" for a direct results URL, "form" for the form flow.
+    :param started: time.monotonic() at the start of the path.
+    """
+    entry = latency[site][path]
+    entry.count += 1
+    entry.total += time.monotonic() - started
+
+
+def latency_report() -> Dict[str, Dict[str, Dict]]:
+    return {
+        site: {path: {'count': entry.count, 'avg_seconds': entry.total / entry.count if entry.count else None}
+               for path, entry in paths.items()}
+        for site, paths in latency.items()
+    }
+
+
+class ResultUrls:
+    def __init__(self, path: str = DEFAULT_TEMPLATES_PATH):
+        self.path = path
+        self._templates: Optional[Dict[str, Dict[str, list]]] = None
+        self._broken: Set[Tuple[str, str]] = set()
+
+    @property
+    def templates(self) -> Dict[str, Dict[str, list]]:
+        if self._templates is None:
+            try:
+                with open(self.path, encoding='utf-8') as templates_file:
+                    self._templates = json.load(templates_file)
+            except (OSError, ValueError):
+                self._templates = {}
+        return self._templates
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as templates_file:
+            json.dump(self.templates, templates_file, ensure_ascii=False)
+
+    def learn(self, site: str, origin_id, destination_id, url: str, date_text: str, date_format: str) -> bool:
+        """
+        Stores the results URL of a route as a template, if the typed date can be found in it.
+        :param date_text: The date as it was typed into the form.
+        :param date_format: strftime format of date_text.
+        """
+        for encoded in (date_text, quote(date_text, safe='')):
+            if encoded and encoded in url:
+                template = url.replace(DATE_PLACEHOLDER, '').replace(encoded, DATE_PLACEHOLDER)
+                quoted = encoded != date_text
+                route = f'{origin_id}-{destination_id}'
+                if self.templates.get(site, {}).get(route) != [template, date_format, quoted]:
+                    self.templates.setdefault(site, {})[route] = [template, date_format, quoted]
+                    self.save()
+                return True
+        return False
+
+    def build(self, site: str, origin_id, destination_id, date: str,
+              origin: Optional[str] = None, destination: Optional[str] = None) -> Optional[str]:
+        """
+        Results URL of the route for the date, None when the site has no builder and nothing was learned.
+        """
+        learned = self.templates.get(site, {}).get(f'{origin_id}-{destination_id}')
+        if learned:
+            template, date_format, quoted = learned
+            date_text = datetime.fromisoformat(date).strftime(date_format)
+            return template.replace(DATE_PLACEHOLDER, quote(date_text, safe='') if quoted else date_text)
+        if site in BUILDERS and origin and destination and (site, f'{origin_id}-{destination_id}') not in self._broken:
+            return BUILDERS[site](origin, destination, date)
+        return None
+
+    def forget(self, site: str, origin_id, destination_id):
+        """
+        Called when the URL of the route loaded but led to no results: the learned template is dropped
+        (the next form search learns it again) and a built URL is not tried again by this process.
+        """
+        route = f'{origin_id}-{destination_id}'
+        if self.templates.get(site, {}).pop(route, None) is not None:
+            self.save()
+        elif site in BUILDERS:
+            self._broken.add((site, route))
+
+
+result_urls = ResultUrls()
+
+
+async def goto_results(page: Page, site: str, origin_id, destination_id, date: str, logger: Logger,
+                       origin: Optional[str] = None, destination: Optional[str] = None) -> Optional[float]:
+    """
+    Opens the results URL of the route directly.
+    :return: When the navigation started (for record_latency), None when there is no URL for the route
+             or it did not load.
+    """
+    url = result_urls.build(site, origin_id, destination_id, date, origin, destination)
+    if url is None:
+        return None
+    started = time.monotonic()
+    await intercept(page, site)
+    try:
+        await page.goto(url, timeout=90000)
+    except (TimeoutError, PageError):
+        logger.error(f'Result URL of {site} did not load, using the form: {url}')
+        return None
+    return started
+
+
+async def open_results(page: Page, site: str, origin_id, destination_id, date: str,
+                       extract: Callable[[Page, str, Logger], Awaitable[Optional[List[Dict]]]], logger: Logger,
+                       origin: Optional[str] = None, destination: Optional[str] = None) -> Optional[List[Dict]]:
+    """
+    Opens the results URL of the route directly and reads it with the scraper's extract_results.
+    :return: Data rows, None when there is no URL for the route or it did not lead to results,
+             in which case the caller runs the form flow.
+    """
+    started = await goto_results(page, site, origin_id, destination_id, date, logger, origin, destination)
+    if started is None:
+        return None
+    list_dict = await extract(page, date, logger)
+    if list_dict is None:
+        result_urls.forget(site, origin_id, destination_id)
+    else:
+        record_latency(site, 'url', started)
+    return list_dict
+
+
+def learn_results(page: Page, site: str, origin_id, destination_id, date_text: str, date_format: str,
+                  started: float):
+    """
+    Called after a successful form search: records its latency and learns the results URL of the route.
+    """
+    record_latency(site, 'form', started)
+    result_urls.learn(site, origin_id, destination_id, page.url, date_text, date_format)
@@ -0,0 +1,51 @@
+from collections import Counter, defaultdict
+from logging import Logger
+from pyppeteer.page import Page
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from scripts.utils.waiting import Condition, wait_first
+
+'''
+    Which layout variant each site served, counted per process: {site: Counter({variant name: hits})}.
+'''
+stats: Dict[str, Counter] = defaultdict(Counter)
+
+
+class Variant(NamedTuple):
+    """
+    One known result page layout: the condition which identifies it and the extractor which reads it.
+    The extractor returns the data rows, or None when the layout turned out to have no results.
+    """
+    name: str
+    probe: Condition
+    extract: Callable[[Page, str, Logger], Awaitable[Optional[List[Dict]]]]
+
+
+class VariantDetector:
+    """
+    Probes all known layouts of a site at the same time and returns the one which appears first.
+    Variants are checked in order of how often they were live, so the common one wins ties.
+    """
+
+    def __init__(self, site: str, variants: List[Variant], failures: Optional[Dict[str, Condition]] = None):
+        self.site = site
+        self.variants = {variant.name: variant for variant in variants}
+        self.failures = failures or {}
+
+    def ordered(self) -> List[Variant]:
+        hits = stats[self.site]
+        return sorted(self.variants.values(), key=lambda variant: -hits[variant.name])
+
+    async def detect(self, page: Page, timeout: int = 30000) -> Optional[Variant]:
+        """
+        :return: The live variant, None when a failure condition holds or nothing appeared in time.
+        """
+        conditions = {variant.name: variant.probe for variant in self.ordered()}
+        conditions.update(self.failures)
+        name = await wait_first(page, conditions, timeout)
+        stats[self.site][name or 'timeout'] += 1
+        return self.variants.get(name)
+
+
+def report() -> Dict[str, Dict[str, int]]:
+    return {site: dict(hits) for site, hits in stats.items()}
@@ -0,0 +1,65 @@
+from pyppeteer.errors import TimeoutError
+from pyppeteer.page import Page
+from typing import Dict, Optional, Tuple, Union
+
+from scripts.utils.extraction import QUERY_JS
+
+'''
+    Condition: a selector (CSS or XPath, as in extraction) or a (selector, text) pair,
+    where the element must also contain the text (case insensitive).
+'''
+Condition = Union[str, Tuple[str, str]]
+
+'''
+    Failure conditions most sites share: a toastr / bootstrap error message.
+'''
+ERROR_TOAST = {'error': '.toast-error, .alert-danger'}
+
+FIRST_MATCH_JS = '''(conditions, visible) => {
+    %s
+    const isVisible = (node) => !visible || node.nodeType !== 1
+        || !!(node.offsetWidth || node.offsetHeight || node.getClientRects().length);
+    for (const [name, selector, text] of conditions) {
+        for (const node of query(document, selector)) {
+            if (!isVisible(node)) {
+                continue;
+            }
+            if (text && !node.textContent.toLowerCase().includes(text)) {
+                continue;
+            }
+            return name;
+        }
+    }
+    return false;
+}''' % QUERY_JS
+
+
+def _normalize_conditions(conditions: Dict[str, Condition]) -> list:
+    normalized = []
+    for name, condition in conditions.items():
+        if isinstance(condition, str):
+            normalized.append([name, condition, ''])
+        else:
+            selector, text = condition
+            normalized.append([name, selector, text.lower()])
+    return normalized
+
+
+async def wait_first(page: Page, conditions: Dict[str, Condition], timeout: int = 50000,
+                     visible: bool = True) -> Optional[str]:
+    """
+    Races several success / failure conditions in the page and resolves as soon as one of them holds,
+    re-checking on every DOM mutation instead of sleeping through a fixed timeout.
+    Conditions are checked in the given order, so list the success ones first.
+    :param page: Page object used to navigate in Tab of Browser.
+    :param conditions: Mapping of a name to a Condition.
+    :param timeout: Milliseconds to wait before giving up.
+    :param visible: Only count elements which are rendered.
+    :return: Name of the first condition which holds, None on timeout.
+    """
+    try:
+        handle = await page.waitForFunction(FIRST_MATCH_JS, {'polling': 'mutation', 'timeout': timeout},
+                                            _normalize_conditions(conditions), visible)
+    except TimeoutError:
+        return None
+    return await handle.jsonValue()